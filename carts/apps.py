@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CartsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "carts"
+
+    def ready(self):
+        from carts import checks, signals  # noqa: F401
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.checks import Error, register
+from django.utils.module_loading import import_string
+
+# Backends that lose entries: kept per process, never stored, or evicted
+# when full.
+EPHEMERAL_CACHE_BACKENDS = {
+    "django.core.cache.backends.dummy.DummyCache",
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+}
+
+
+@register()
+def check_anonymous_cart_cache(app_configs, **kwargs):
+    """Anonymous carts kept in a cache need one that never loses them."""
+    from carts.storage import CacheCartStorage
+
+    storage_class = import_string(settings.ANONYMOUS_CART_STORAGE)
+    if not issubclass(storage_class, CacheCartStorage):
+        return []
+
+    backend = settings.CACHES.get(settings.ANONYMOUS_CART_CACHE, {}).get("BACKEND")
+    if backend is None:
+        return [
+            Error(
+                f"ANONYMOUS_CART_CACHE '{settings.ANONYMOUS_CART_CACHE}' is not "
+                "a configured cache.",
+                hint="Set DJANGO_ANONYMOUS_CART_REDIS_URL, or keep anonymous "
+                "carts in the database with carts.storage.DatabaseCartStorage.",
+                id="carts.E001",
+            )
+        ]
+    if backend in EPHEMERAL_CACHE_BACKENDS:
+        return [
+            Error(
+                f"Anonymous carts can't be kept in {backend}, which loses entries.",
+                hint="Use a shared, persistent cache that never evicts, or "
+                "carts.storage.DatabaseCartStorage.",
+                id="carts.E002",
+            )
+        ]
+    return []
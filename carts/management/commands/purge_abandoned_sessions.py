@@ -0,0 +1,38 @@
+import logging
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from carts.storage import purge_abandoned_sessions
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired sessions and the empty carts they leave behind; carts "
+        "with items are marked abandoned (run periodically)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of sessions or carts handled per query",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sessions_deleted, carts_deleted, carts_abandoned = purge_abandoned_sessions(
+                options["batch_size"]
+            )
+        except ImproperlyConfigured as e:
+            raise CommandError(e)
+
+        summary = (
+            f"Deleted {sessions_deleted} expired sessions and {carts_deleted} "
+            f"empty carts, marked {carts_abandoned} carts abandoned"
+        )
+        logger.info(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
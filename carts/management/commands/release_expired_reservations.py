@@ -0,0 +1,27 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from carts.reservations import release_expired_reservations
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Return the stock of expired cart reservations (run periodically)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of reservations released per transaction",
+        )
+
+    def handle(self, *args, **options):
+        released_count = release_expired_reservations(options["batch_size"])
+
+        logger.info(f"Released {released_count} expired stock reservations")
+        self.stdout.write(
+            self.style.SUCCESS(f"Released {released_count} expired stock reservations")
+        )
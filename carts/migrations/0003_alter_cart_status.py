@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("carts", "0002_stockreservation"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="cart",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("ABANDONED", "Abandoned"),
+                    ("ACTIVE", "Active"),
+                    ("COMPLETED", "Completed"),
+                ],
+                default="ACTIVE",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("carts", "0003_alter_cart_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cart",
+            name="version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,27 +1,77 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Coalesce, Greatest
 from django.utils.translation import gettext_lazy as _
 
 from common.models import TimestampedModel
 from products.models import ProductVariant
 
 
+class CartQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Annotate 'items_total_price' and 'items_total_quantity' in SQL; the
+        total_price and total_items properties read them when present.
+        """
+        return self.annotate(
+            items_total_price=Coalesce(
+                models.Sum(F("items__quantity") * F("items__product_variant__price")),
+                Decimal("0.00"),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            items_total_quantity=Coalesce(models.Sum("items__quantity"), 0),
+        )
+
+    def with_lines_state(self):
+        """
+        Annotate 'lines_count' and 'lines_updated_at', the last change to the
+        variants and products the lines show; cart ETags are built from them.
+        """
+        return self.annotate(
+            lines_count=models.Count("items"),
+            lines_updated_at=models.Max(
+                Greatest(
+                    "items__product_variant__updated_at",
+                    "items__product_variant__product__updated_at",
+                )
+            ),
+        )
+
+
+class CartItemQuerySet(models.QuerySet):
+    def with_line_totals(self):
+        """Annotate 'line_total', read by the total_price property when present."""
+        return self.annotate(line_total=F("quantity") * F("product_variant__price"))
+
+
 # Create your models here.
 class Cart(TimestampedModel):
     class Status(models.TextChoices):
         ABANDONED = "ABANDONED", _("Abandoned")
         ACTIVE = "ACTIVE", _("Active")
+        COMPLETED = "COMPLETED", _("Completed")
 
     status = models.CharField(
         max_length=20, choices=Status.choices, default=Status.ACTIVE
     )
     session_key = models.CharField(max_length=255, db_index=True)
+    # Bumped by every change to the cart's lines; the cart API's ETag.
+    version = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CartQuerySet.as_manager()
 
     @property
     def total_price(self):
+        if hasattr(self, "items_total_price"):
+            return self.items_total_price
         return sum(item.total_price for item in self.items.all())
 
     @property
     def total_items(self):
+        if hasattr(self, "items_total_quantity"):
+            return self.items_total_quantity
         return sum(item.quantity for item in self.items.all())
 
     def __str__(self):
@@ -33,9 +83,40 @@ class CartItem(TimestampedModel):
     product_variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    objects = CartItemQuerySet.as_manager()
+
     @property
     def total_price(self):
+        if hasattr(self, "line_total"):
+            return self.line_total
         return self.product_variant.price * self.quantity
 
     def __str__(self):
         return f"{self.quantity} x {self.product_variant.sku}"
+
+
+class StockReservation(TimestampedModel):
+    """
+    Stock held for a cart line. The reserved quantity has already been taken
+    off ProductVariant.stock_quantity and is given back if the reservation
+    expires before checkout (see carts.reservations).
+    """
+
+    cart = models.ForeignKey(
+        Cart, on_delete=models.CASCADE, related_name="reservations"
+    )
+    product_variant = models.ForeignKey(
+        ProductVariant, on_delete=models.CASCADE, related_name="reservations"
+    )
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cart", "product_variant"], name="unique_cart_reservation"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_variant_id} for cart {self.cart_id}"
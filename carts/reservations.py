@@ -0,0 +1,201 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from products.models import Product, ProductVariant
+from products.signals import invalidate_stock_on_commit
+
+from .models import StockReservation
+
+
+class InsufficientStockError(ValidationError):
+    """
+    Raised when a reservation can't be met. 'shortages' maps each variant id
+    that fell short to the quantity that was still available.
+    """
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(
+            [
+                f"Only {available} items available in stock."
+                for available in shortages.values()
+            ]
+        )
+
+
+def get_reservation_expiry():
+    return timezone.now() + timedelta(minutes=settings.STOCK_RESERVATION_TTL_MINUTES)
+
+
+# Takes each delta only where enough stock is left, so concurrent checkouts
+# can never oversell. The subselect locks the rows in ascending id order
+# before any is written, so two carts sharing variants can't deadlock.
+ADJUST_STOCK_SQL = """
+UPDATE {variant_table} AS v
+SET stock_quantity = v.stock_quantity - d.delta
+FROM
+    (SELECT unnest(%s::bigint[]) AS id, unnest(%s::integer[]) AS delta) AS d,
+    {product_table} AS p
+WHERE v.id = d.id
+    AND p.id = v.product_id
+    AND v.id IN (
+        SELECT id FROM {variant_table}
+        WHERE id = ANY(%s::bigint[])
+        ORDER BY id
+        FOR UPDATE
+    )
+    AND v.stock_quantity >= d.delta
+RETURNING v.id, p.id, p.slug, v.stock_quantity
+"""
+
+
+def adjust_stock(deltas):
+    """
+    Apply {variant_id: delta} to ProductVariant.stock_quantity, where a
+    positive delta takes stock and a negative one gives it back.
+
+    One conditional UPDATE (see ADJUST_STOCK_SQL), however many variants are
+    touched. If any variant falls short, InsufficientStockError is raised and
+    the savepoint drops whatever was written. The listings and cached
+    details of the products are refreshed on commit; the cached product lists
+    only when a variant went in or out of stock.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    pks = sorted(deltas)
+    sql = ADJUST_STOCK_SQL.format(
+        variant_table=connection.ops.quote_name(ProductVariant._meta.db_table),
+        product_table=connection.ops.quote_name(Product._meta.db_table),
+    )
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [pks, [deltas[pk] for pk in pks], pks])
+            rows = cursor.fetchall()
+
+        short = deltas.keys() - {variant_id for variant_id, *_ in rows}
+        if short:
+            stock = dict(
+                ProductVariant.objects.filter(pk__in=short).values_list(
+                    "pk", "stock_quantity"
+                )
+            )
+            raise InsufficientStockError({pk: stock.get(pk, 0) for pk in short})
+
+    invalidate_stock_on_commit(
+        {product_id: slug for _, product_id, slug, _ in rows},
+        in_stock_changed=any(
+            (stock > 0) != (stock + deltas[variant_id] > 0)
+            for variant_id, _, _, stock in rows
+        ),
+    )
+
+
+@transaction.atomic
+def reserve_stock(cart, quantities):
+    """
+    Adjust the cart's reservations by {variant_id: delta}.
+    - A positive delta takes stock and grows the reservation
+    - A negative delta gives back at most what the cart still holds
+    Every reservation of the cart gets a fresh expiry.
+    """
+    # Lock every reservation of the cart so the expiry sweeper skips them.
+    reservations = {
+        reservation.product_variant_id: reservation
+        for reservation in StockReservation.objects.select_for_update().filter(
+            cart=cart
+        )
+    }
+
+    taken = {pk: delta for pk, delta in quantities.items() if delta > 0}
+    released = {
+        pk: min(-delta, reservations[pk].quantity)
+        for pk, delta in quantities.items()
+        if delta < 0 and pk in reservations
+    }
+
+    adjust_stock({**taken, **{pk: -quantity for pk, quantity in released.items()}})
+
+    expires_at = get_reservation_expiry()
+    to_save = []
+    for pk, quantity in taken.items():
+        held = reservations[pk].quantity if pk in reservations else 0
+        to_save.append(
+            StockReservation(
+                cart=cart,
+                product_variant_id=pk,
+                quantity=held + quantity,
+                expires_at=expires_at,
+            )
+        )
+    StockReservation.objects.bulk_create(
+        to_save,
+        update_conflicts=True,
+        unique_fields=["cart", "product_variant"],
+        update_fields=["quantity", "expires_at", "updated_at"],
+    )
+
+    for pk, quantity in released.items():
+        reservation = reservations[pk]
+        if quantity >= reservation.quantity:
+            reservation.delete()
+        else:
+            reservation.quantity -= quantity
+            reservation.save(update_fields=["quantity", "updated_at"])
+
+    StockReservation.objects.filter(cart=cart).update(expires_at=expires_at)
+
+
+@transaction.atomic
+def commit_reservations(cart, quantities):
+    """
+    Turn the cart's reservations into a sale of {variant_id: quantity}.
+    Whatever is no longer reserved (e.g. an expired reservation) is taken
+    from stock now; the reservations are then dropped. Surplus reservations
+    are given back.
+    """
+    reserved = dict(
+        StockReservation.objects.select_for_update()
+        .filter(cart=cart)
+        .values_list("product_variant_id", "quantity")
+    )
+
+    deltas = {pk: -held for pk, held in reserved.items()}
+    for pk, quantity in quantities.items():
+        deltas[pk] = deltas.get(pk, 0) + quantity
+    adjust_stock(deltas)
+    StockReservation.objects.filter(cart=cart).delete()
+
+
+def release_expired_reservations(batch_size=500):
+    """
+    Give back the stock of expired reservations in batches. Each batch is one
+    transaction; rows another worker is releasing are skipped.
+    Returns the number of reservations released.
+    """
+    released_count = 0
+    while True:
+        with transaction.atomic():
+            expired = list(
+                StockReservation.objects.select_for_update(skip_locked=True)
+                .filter(expires_at__lte=timezone.now())
+                .order_by("pk")
+                .values_list("pk", "product_variant_id", "quantity")[:batch_size]
+            )
+            if not expired:
+                return released_count
+
+            quantities = {}
+            for _, variant_id, quantity in expired:
+                quantities[variant_id] = quantities.get(variant_id, 0) + quantity
+
+            adjust_stock({pk: -quantity for pk, quantity in quantities.items()})
+            StockReservation.objects.filter(
+                pk__in=[pk for pk, _, _ in expired]
+            ).delete()
+            released_count += len(expired)
@@ -1,6 +1,8 @@
+from django.db import models
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
+from common.serializers import MeasuredSerializerMixin
 from products.models import ProductVariant
 
 from .models import Cart, CartItem
@@ -61,25 +63,14 @@ class CartItemAddSerializer(serializers.ModelSerializer):
         fields = ["product_variant_id", "quantity"]
 
     def validate(self, data):
-        variant_id = data.get("product_variant_id")
-        quantity = data.get("quantity")
-
-        try:
-            variant = ProductVariant.objects.get(id=variant_id)
-        except ProductVariant.DoesNotExist:
+        # Stock is checked atomically when the line is reserved in the view.
+        if not ProductVariant.objects.filter(
+            id=data.get("product_variant_id")
+        ).exists():
             raise serializers.ValidationError(
                 {"product_variant_id": _("Product not found.")}
             )
 
-        if quantity > variant.stock_quantity:
-            raise serializers.ValidationError(
-                {
-                    "quantity": _(
-                        f"Only {variant.stock_quantity} items available in stock."
-                    )
-                }
-            )
-
         return data
 
 
@@ -87,7 +78,24 @@ class CartItemUpdateSerializer(serializers.Serializer):
     quantity = serializers.IntegerField(min_value=1)
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartBatchOperationSerializer(serializers.Serializer):
+    class Op(models.TextChoices):
+        ADD = "add", _("Add")
+        SET = "set", _("Set")
+        REMOVE = "remove", _("Remove")
+
+    product_variant_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, default=0)
+    op = serializers.ChoiceField(choices=Op.choices, default=Op.ADD)
+
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartBatchOperationSerializer(
+        many=True, allow_empty=False, max_length=100
+    )
+
+
+class CartSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total_price = serializers.DecimalField(
         max_digits=10, decimal_places=2, read_only=True
@@ -96,5 +104,26 @@ class CartSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Cart
-        fields = ["id", "session_key", "status", "items", "total_price", "total_items"]
+        fields = [
+            "id",
+            "session_key",
+            "status",
+            "version",
+            "items",
+            "total_price",
+            "total_items",
+        ]
         read_only_fields = ["status", "session_key"]
+
+
+class CartDeltaSerializer(MeasuredSerializerMixin, serializers.Serializer):
+    """
+    What a cart mutation changed: the touched line ('item' is null once it's
+    removed) plus the new totals and version.
+    """
+
+    item_id = serializers.IntegerField()
+    item = CartItemSerializer(allow_null=True)
+    total_price = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total_items = serializers.IntegerField()
+    version = serializers.IntegerField()
@@ -0,0 +1,10 @@
+from django.contrib.auth.signals import user_logged_in
+from django.dispatch import receiver
+
+from carts.storage import promote_anonymous_cart
+
+
+@receiver(user_logged_in)
+def promote_cart_on_login(sender, request, user, **kwargs):
+    if request is not None:
+        promote_anonymous_cart(request)
@@ -0,0 +1,677 @@
+import re
+import secrets
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Prefetch
+from django.db.models.functions import Greatest
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+
+from common.timing import record_cache_lookup
+from products.models import ProductVariant
+
+from .models import Cart, CartItem
+from .reservations import InsufficientStockError, reserve_stock
+from .serializers import CartBatchOperationSerializer
+
+# Set on the session once its cart has been promoted to the database.
+DATABASE_CART_SESSION_KEY = "_cart_in_database"
+
+ANONYMOUS_CART_TOKEN_RE = re.compile(r"^[A-Za-z0-9_-]{43}$")
+
+# Session engines whose sessions all have a django_session row.
+DATABASE_SESSION_ENGINES = {
+    "django.contrib.sessions.backends.db",
+    "django.contrib.sessions.backends.cached_db",
+}
+
+
+def get_cart_storage(request):
+    """
+    The storage holding the request's cart: CART_STORAGE for logged-in users
+    and promoted carts, ANONYMOUS_CART_STORAGE for everybody else.
+    """
+    if request.user.is_authenticated or request.session.get(DATABASE_CART_SESSION_KEY):
+        return import_string(settings.CART_STORAGE)(request)
+    return import_string(settings.ANONYMOUS_CART_STORAGE)(request)
+
+
+def promote_anonymous_cart(request):
+    """
+    Move the request's anonymous cart into its database cart, reserving the
+    stock; called at login and checkout. The session uses the database cart
+    from then on. Lines stock can't cover are dropped and returned as batch
+    errors (see BaseCartStorage.apply_batch). The anonymous cart is only
+    cleared once the database holds its lines.
+    """
+    if settings.ANONYMOUS_CART_STORAGE == settings.CART_STORAGE:
+        # Anonymous carts are in the database already.
+        return []
+
+    anonymous_storage = import_string(settings.ANONYMOUS_CART_STORAGE)(request)
+    database_storage = import_string(settings.CART_STORAGE)(request)
+    lines = anonymous_storage.get_lines()
+    if not lines:
+        # A database cart from an earlier promotion stays the session's cart,
+        # so checkout never orders lines the cart API doesn't show.
+        if database_storage.get_version() is not None:
+            request.session[DATABASE_CART_SESSION_KEY] = True
+        return []
+
+    errors = database_storage.apply_batch(
+        [
+            {
+                "product_variant_id": variant_id,
+                "quantity": quantity,
+                "op": CartBatchOperationSerializer.Op.ADD,
+            }
+            for variant_id, quantity in lines.items()
+        ]
+    )
+    anonymous_storage.clear()
+    request.session[DATABASE_CART_SESSION_KEY] = True
+    return errors
+
+
+def purge_abandoned_sessions(batch_size=500):
+    """
+    Delete expired sessions in batches, then let go of the database carts no
+    session points to any more: empty ones are deleted, the others marked
+    ABANDONED (their reservations lapse and release_expired_reservations
+    gives the stock back). Returns the number of sessions deleted, carts
+    deleted and carts abandoned.
+
+    Raises ImproperlyConfigured unless SESSION_ENGINE keeps sessions in the
+    database: otherwise no session has a row and every cart looks orphaned.
+    """
+    if settings.SESSION_ENGINE not in DATABASE_SESSION_ENGINES:
+        raise ImproperlyConfigured(
+            f"Sessions of {settings.SESSION_ENGINE} aren't in the database, so "
+            "the carts they point to can't be told apart from orphaned ones."
+        )
+
+    sessions_deleted = 0
+    while True:
+        session_keys = list(
+            Session.objects.filter(expire_date__lt=timezone.now()).values_list(
+                "session_key", flat=True
+            )[:batch_size]
+        )
+        if not session_keys:
+            break
+        Session.objects.filter(session_key__in=session_keys).delete()
+        sessions_deleted += len(session_keys)
+
+    orphaned = (
+        Cart.objects.filter(status=Cart.Status.ACTIVE)
+        .exclude(Exists(Session.objects.filter(session_key=OuterRef("session_key"))))
+        .annotate(has_items=Exists(CartItem.objects.filter(cart=OuterRef("pk"))))
+    )
+    carts_deleted = 0
+    carts_abandoned = 0
+    while True:
+        carts = list(
+            orphaned.order_by("pk").values_list("pk", "has_items")[:batch_size]
+        )
+        if not carts:
+            break
+        empty = [pk for pk, has_items in carts if not has_items]
+        with transaction.atomic():
+            Cart.objects.filter(pk__in=empty).delete()
+            carts_abandoned += Cart.objects.filter(
+                pk__in=[pk for pk, has_items in carts if has_items]
+            ).update(status=Cart.Status.ABANDONED)
+        carts_deleted += len(empty)
+
+    return sessions_deleted, carts_deleted, carts_abandoned
+
+
+def get_batch_targets(current, operations, known_variant_ids):
+    """
+    Fold batch operations into {variant_id: target quantity}, starting from the
+    'current' quantities. Returns the targets, {variant_id: [operation index]}
+    and the errors of operations on unknown variants.
+    """
+    targets = {}
+    indexes = {}
+    errors = []
+    for index, operation in enumerate(operations):
+        variant_id = operation["product_variant_id"]
+        if variant_id not in known_variant_ids:
+            errors.append(
+                {
+                    "index": index,
+                    "product_variant_id": variant_id,
+                    "error": _("Product not found."),
+                }
+            )
+            continue
+
+        quantity = targets.get(variant_id, current.get(variant_id, 0))
+        if operation["op"] == CartBatchOperationSerializer.Op.ADD:
+            quantity += operation["quantity"]
+        elif operation["op"] == CartBatchOperationSerializer.Op.SET:
+            quantity = operation["quantity"]
+        else:
+            quantity = 0
+        targets[variant_id] = quantity
+        indexes.setdefault(variant_id, []).append(index)
+
+    return targets, indexes, errors
+
+
+def get_lines_state(items):
+    """(line count, last change to their variants or products) of cart items."""
+    return (
+        len(items),
+        max(
+            (
+                max(
+                    item.product_variant.updated_at,
+                    item.product_variant.product.updated_at,
+                )
+                for item in items
+            ),
+            default=None,
+        ),
+    )
+
+
+def get_shortage_errors(shortages, indexes):
+    return [
+        {
+            "index": index,
+            "product_variant_id": variant_id,
+            "error": _("Only {available} items available in stock.").format(
+                available=available
+            ),
+        }
+        for variant_id, available in shortages.items()
+        for index in indexes[variant_id]
+    ]
+
+
+class DetachedCart:
+    """
+    A cart without a Cart row (an anonymous cart read from the cache, or an
+    empty one), shaped like Cart for CartSerializer.
+    """
+
+    id = None
+    session_key = None
+    status = Cart.Status.ACTIVE
+
+    def __init__(self, version, items):
+        self.version = version
+        self.items = items
+        self.total_price = sum((item.total_price for item in items), Decimal("0.00"))
+        self.total_items = sum(item.quantity for item in items)
+
+
+class BaseCartStorage:
+    """
+    Where a cart lives. Carts returned by get_cart() render with
+    CartSerializer, whatever the storage; the 'id' of their items is the
+    line id update_item() and remove_item() take.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        # (line count, last change to the lines' variants) as last read by
+        # get_cart, get_version or get_delta. Lines aren't versioned when a
+        # variant changes or is deleted, so ETags carry it too.
+        self.lines_state = (0, None)
+
+    def get_cart(self):
+        """The cart with its items and totals."""
+        raise NotImplementedError
+
+    def get_version(self):
+        """The cart version, as cheaply as possible; None without a cart."""
+        raise NotImplementedError
+
+    def get_etag(self, version):
+        raise NotImplementedError
+
+    def get_lines_validator(self):
+        count, updated_at = self.lines_state
+        stamp = int(updated_at.timestamp() * 1_000_000) if updated_at else 0
+        return f"{count}-{stamp:x}"
+
+    def get_delta(self, item_id):
+        """The data CartDeltaSerializer renders for a changed line."""
+        raise NotImplementedError
+
+    def add_item(self, variant_id, quantity):
+        """Add to the variant's line; returns the line id."""
+        raise NotImplementedError
+
+    def update_item(self, item_id, quantity):
+        raise NotImplementedError
+
+    def remove_item(self, item_id):
+        raise NotImplementedError
+
+    def apply_batch(self, operations):
+        """
+        Apply validated CartBatchOperationSerializer operations at once.
+        Returns the errors of the operations that were skipped, by index.
+        """
+        raise NotImplementedError
+
+    def process_response(self, response):
+        return response
+
+
+class DatabaseCartStorage(BaseCartStorage):
+    """
+    Carts as Cart and CartItem rows of the session; stock is reserved as the
+    lines change.
+    """
+
+    def __init__(self, request):
+        super().__init__(request)
+        self.cart_id = None
+
+    def get_session_key(self, create=False):
+        """
+        The session key, None without a session; with create=True a session
+        is saved first. get_cart_storage has loaded the session by now, which
+        drops the key of an expired one.
+        """
+        if create and self.request.session.session_key is None:
+            self.request.session.save()
+        return self.request.session.session_key
+
+    def get_queryset(self):
+        session_key = self.get_session_key()
+        if session_key is None:
+            return Cart.objects.none()
+        return Cart.objects.filter(session_key=session_key, status=Cart.Status.ACTIVE)
+
+    def get_or_create_cart(self):
+        """The cart lines are written to; the session and cart are created on demand."""
+        session_key = self.get_session_key(create=True)
+        cart = self.get_queryset().first()
+
+        if not cart:
+            cart = Cart.objects.create(
+                session_key=session_key, status=Cart.Status.ACTIVE
+            )
+
+        self.cart_id = cart.pk
+        return cart
+
+    def get_cart(self):
+        cart = (
+            self.get_queryset()
+            .with_totals()
+            .prefetch_related(
+                Prefetch(
+                    "items",
+                    queryset=CartItem.objects.with_line_totals()
+                    .select_related("product_variant__product")
+                    .order_by("pk"),
+                )
+            )
+            .first()
+        )
+        if cart is None:
+            self.lines_state = (0, None)
+            return DetachedCart(0, [])
+
+        self.cart_id = cart.pk
+        self.lines_state = get_lines_state(cart.items.all())
+        return cart
+
+    def get_version(self):
+        state = (
+            self.get_queryset()
+            .with_lines_state()
+            .values_list("pk", "version", "lines_count", "lines_updated_at")
+            .first()
+        )
+        if state is None:
+            return None
+        self.cart_id, version, *self.lines_state = state
+        return version
+
+    def get_etag(self, version):
+        return f'"cart-{self.cart_id or 0}-{version}-{self.get_lines_validator()}"'
+
+    def bump_version(self, cart_id):
+        """Mark the cart as changed; also locks its row for the transaction."""
+        Cart.objects.filter(pk=cart_id).update(version=F("version") + 1)
+
+    def get_delta(self, item_id):
+        totals = (
+            Cart.objects.with_totals()
+            .with_lines_state()
+            .filter(pk=self.cart_id)
+            .values(
+                "version",
+                "items_total_price",
+                "items_total_quantity",
+                "lines_count",
+                "lines_updated_at",
+            )
+            .get()
+        )
+        self.lines_state = (totals["lines_count"], totals["lines_updated_at"])
+        item = (
+            CartItem.objects.with_line_totals()
+            .select_related("product_variant__product")
+            .filter(pk=item_id)
+            .first()
+        )
+        return {
+            "item_id": item_id,
+            "item": item,
+            "total_price": totals["items_total_price"],
+            "total_items": totals["items_total_quantity"],
+            "version": totals["version"],
+        }
+
+    def get_item_for_update(self, item_id):
+        cart_id = (
+            CartItem.objects.filter(
+                pk=item_id, cart__session_key=self.get_session_key()
+            )
+            .values_list("cart_id", flat=True)
+            .first()
+        )
+        if cart_id is None:
+            raise Http404
+
+        # Every mutation locks the cart row before its lines, so two requests
+        # on the same cart queue up instead of deadlocking.
+        self.cart_id = cart_id
+        self.bump_version(cart_id)
+        return get_object_or_404(
+            CartItem.objects.select_for_update(), pk=item_id, cart_id=cart_id
+        )
+
+    def add_item(self, variant_id, quantity):
+        cart = self.get_or_create_cart()
+
+        with transaction.atomic():
+            self.bump_version(cart.pk)
+            cart_item, created = CartItem.objects.select_for_update().get_or_create(
+                cart=cart,
+                product_variant_id=variant_id,
+                defaults={"quantity": 0},
+            )
+            reserve_stock(cart, {variant_id: quantity})
+
+            cart_item.quantity += quantity
+            cart_item.save()
+
+        return cart_item.pk
+
+    def update_item(self, item_id, quantity):
+        with transaction.atomic():
+            cart_item = self.get_item_for_update(item_id)
+            reserve_stock(
+                cart_item.cart,
+                {cart_item.product_variant_id: quantity - cart_item.quantity},
+            )
+
+            cart_item.quantity = quantity
+            cart_item.save()
+
+    def remove_item(self, item_id):
+        with transaction.atomic():
+            cart_item = self.get_item_for_update(item_id)
+            reserve_stock(
+                cart_item.cart, {cart_item.product_variant_id: -cart_item.quantity}
+            )
+            cart_item.delete()
+
+    def apply_batch(self, operations):
+        cart = self.get_or_create_cart()
+        known_variant_ids = set(
+            ProductVariant.objects.filter(
+                pk__in={operation["product_variant_id"] for operation in operations}
+            ).values_list("pk", flat=True)
+        )
+
+        with transaction.atomic():
+            self.bump_version(cart.pk)
+            items = {
+                item.product_variant_id: item
+                for item in CartItem.objects.select_for_update()
+                .filter(cart=cart)
+                .order_by("pk")
+            }
+
+            current = {pk: item.quantity for pk, item in items.items()}
+            targets, indexes, errors = get_batch_targets(
+                current, operations, known_variant_ids
+            )
+
+            # Drop the lines stock can't cover and reserve the rest; each
+            # failed attempt rolls back its own savepoint.
+            while True:
+                deltas = {
+                    pk: quantity - current.get(pk, 0)
+                    for pk, quantity in targets.items()
+                }
+                try:
+                    reserve_stock(cart, deltas)
+                    break
+                except InsufficientStockError as e:
+                    errors.extend(get_shortage_errors(e.shortages, indexes))
+                    for variant_id in e.shortages:
+                        del targets[variant_id]
+
+            removed = [
+                items[pk].pk
+                for pk, quantity in targets.items()
+                if not quantity and pk in items
+            ]
+            changed = []
+            added = []
+            for pk, quantity in targets.items():
+                if not quantity:
+                    continue
+                if pk in items:
+                    items[pk].quantity = quantity
+                    changed.append(items[pk])
+                else:
+                    added.append(
+                        CartItem(cart=cart, product_variant_id=pk, quantity=quantity)
+                    )
+
+            CartItem.objects.filter(pk__in=removed).delete()
+            CartItem.objects.bulk_update(changed, ["quantity"])
+            CartItem.objects.bulk_create(added)
+
+        return sorted(errors, key=lambda error: error["index"])
+
+
+class CacheCartStorage(BaseCartStorage):
+    """
+    Anonymous carts as {variant_id: quantity} in the ANONYMOUS_CART_CACHE
+    cache, keyed by a random token cookie and expiring ANONYMOUS_CART_TTL
+    seconds after the last change. Neither a session nor a database row is
+    created; stock is checked on every change but only reserved once the cart
+    is promoted (see promote_anonymous_cart). Line ids are variant ids.
+    """
+
+    def __init__(self, request):
+        super().__init__(request)
+        self.cache = caches[settings.ANONYMOUS_CART_CACHE]
+        token = request.COOKIES.get(settings.ANONYMOUS_CART_COOKIE_NAME, "")
+        self.token = token if ANONYMOUS_CART_TOKEN_RE.match(token) else None
+        self.written = False
+        self.data = None
+
+    def get_cache_key(self):
+        return f"anonymous-cart:{self.token}"
+
+    def read(self):
+        if self.data is None:
+            if self.token:
+                self.data = self.cache.get(self.get_cache_key())
+                record_cache_lookup(hit=self.data is not None)
+            if self.data is None:
+                # 'id' tells a recreated cart apart from an expired one in ETags.
+                self.data = {"id": secrets.token_hex(8), "version": 0, "lines": {}}
+        return self.data
+
+    def write(self):
+        if not self.token:
+            self.token = secrets.token_urlsafe(32)
+        self.data["version"] += 1
+        self.cache.set(self.get_cache_key(), self.data, settings.ANONYMOUS_CART_TTL)
+        self.written = True
+
+    def get_lines(self):
+        """{variant_id: quantity} of the cart; empty without one."""
+        if not self.token:
+            return {}
+        return dict(self.read()["lines"])
+
+    def clear(self):
+        """Delete the cart from the cache."""
+        if self.token:
+            self.cache.delete(self.get_cache_key())
+        self.data = None
+
+    def get_line_id(self, item_id):
+        try:
+            variant_id = int(item_id)
+        except (TypeError, ValueError):
+            raise Http404
+        if variant_id not in self.read()["lines"]:
+            raise Http404
+        return variant_id
+
+    def get_shortages(self, quantities):
+        """{variant_id: available} for the variants stock can't fill up to quantity."""
+        if not quantities:
+            return {}
+
+        stock = dict(
+            ProductVariant.objects.filter(pk__in=quantities).values_list(
+                "pk", "stock_quantity"
+            )
+        )
+        return {
+            pk: stock.get(pk, 0)
+            for pk, quantity in quantities.items()
+            if stock.get(pk, 0) < quantity
+        }
+
+    def check_stock(self, variant_id, quantity):
+        if quantity > self.read()["lines"].get(variant_id, 0):
+            shortages = self.get_shortages({variant_id: quantity})
+            if shortages:
+                raise InsufficientStockError(shortages)
+
+    def get_cart(self):
+        data = self.read()
+        variants = ProductVariant.objects.select_related("product").in_bulk(
+            data["lines"]
+        )
+        # Lines of variants deleted since they were added are left out.
+        items = [
+            CartItem(id=pk, product_variant=variants[pk], quantity=quantity)
+            for pk, quantity in data["lines"].items()
+            if pk in variants
+        ]
+        self.lines_state = get_lines_state(items)
+        return DetachedCart(data["version"], items)
+
+    def get_version(self):
+        if not self.token:
+            return None
+        data = self.read()
+        self.lines_state = (0, None)
+        if data["lines"]:
+            state = ProductVariant.objects.filter(pk__in=data["lines"]).aggregate(
+                lines_count=Count("pk"),
+                lines_updated_at=Max(Greatest("updated_at", "product__updated_at")),
+            )
+            self.lines_state = (state["lines_count"], state["lines_updated_at"])
+        return data["version"]
+
+    def get_etag(self, version):
+        return f'"cart-{self.read()["id"]}-{version}-{self.get_lines_validator()}"'
+
+    def get_delta(self, item_id):
+        cart = self.get_cart()
+        return {
+            "item_id": item_id,
+            "item": next((item for item in cart.items if item.id == item_id), None),
+            "total_price": cart.total_price,
+            "total_items": cart.total_items,
+            "version": cart.version,
+        }
+
+    def add_item(self, variant_id, quantity):
+        lines = self.read()["lines"]
+        quantity += lines.get(variant_id, 0)
+        self.check_stock(variant_id, quantity)
+        lines[variant_id] = quantity
+        self.write()
+        return variant_id
+
+    def update_item(self, item_id, quantity):
+        variant_id = self.get_line_id(item_id)
+        self.check_stock(variant_id, quantity)
+        self.read()["lines"][variant_id] = quantity
+        self.write()
+
+    def remove_item(self, item_id):
+        variant_id = self.get_line_id(item_id)
+        del self.read()["lines"][variant_id]
+        self.write()
+
+    def apply_batch(self, operations):
+        lines = self.read()["lines"]
+        stock = dict(
+            ProductVariant.objects.filter(
+                pk__in={operation["product_variant_id"] for operation in operations}
+            ).values_list("pk", "stock_quantity")
+        )
+        targets, indexes, errors = get_batch_targets(lines, operations, stock)
+
+        shortages = {
+            pk: stock[pk]
+            for pk, quantity in targets.items()
+            if quantity > lines.get(pk, 0) and quantity > stock[pk]
+        }
+        errors.extend(get_shortage_errors(shortages, indexes))
+
+        for pk, quantity in targets.items():
+            if pk in shortages:
+                continue
+            if quantity:
+                lines[pk] = quantity
+            else:
+                lines.pop(pk, None)
+        self.write()
+
+        return sorted(errors, key=lambda error: error["index"])
+
+    def process_response(self, response):
+        # Every change slides the cookie's expiry along with the cache entry's.
+        if self.written:
+            response.set_cookie(
+                settings.ANONYMOUS_CART_COOKIE_NAME,
+                self.token,
+                max_age=settings.ANONYMOUS_CART_TTL,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
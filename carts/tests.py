@@ -1 +1,528 @@
-# Create your tests here.
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.cached_db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.utils import timezone
+
+from carts.checks import check_anonymous_cart_cache
+from carts.models import Cart, CartItem, StockReservation
+from carts.reservations import InsufficientStockError, adjust_stock, reserve_stock
+from carts.serializers import CartBatchOperationSerializer
+from carts.storage import (
+    DATABASE_CART_SESSION_KEY,
+    CacheCartStorage,
+    DatabaseCartStorage,
+    get_cart_storage,
+    promote_anonymous_cart,
+)
+from common.cache import get_namespace_versions
+from products.models import (
+    Attribute,
+    Product,
+    ProductListing,
+    ProductType,
+    ProductVariant,
+)
+
+# Anonymous carts in a cache of their own; locmem is enough for one process.
+CACHE_CART_SETTINGS = {
+    "CACHES": {
+        **settings.CACHES,
+        "carts": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "carts",
+        },
+    },
+    "ANONYMOUS_CART_CACHE": "carts",
+    "ANONYMOUS_CART_STORAGE": "carts.storage.CacheCartStorage",
+}
+
+
+def create_variants(*stock_quantities, price="10.00"):
+    """One published product with a variant per stock quantity."""
+    edition = Attribute.objects.create(name="Edition", slug="edition")
+    product_type = ProductType.objects.create(name="Sculpture")
+    product_type.allowed_attributes.add(edition)
+    product = Product.objects.create(
+        product_type=product_type,
+        title="Bust",
+        status=Product.Status.PUBLISHED,
+        thumbnail="products/bust.jpg",
+    )
+    return [
+        ProductVariant.objects.create(
+            product=product,
+            sku=f"SKU-{index}",
+            price=price,
+            stock_quantity=stock_quantity,
+            image=f"variants/{index}.jpg",
+            attributes={"edition": str(index)},
+        )
+        for index, stock_quantity in enumerate(stock_quantities)
+    ]
+
+
+class AdjustStockTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_shortfall_writes_nothing(self):
+        plenty, scarce = create_variants(10, 1)
+        with self.assertRaises(InsufficientStockError) as ctx:
+            adjust_stock({plenty.pk: 3, scarce.pk: 2})
+
+        self.assertEqual(ctx.exception.shortages, {scarce.pk: 1})
+        plenty.refresh_from_db()
+        scarce.refresh_from_db()
+        self.assertEqual((plenty.stock_quantity, scarce.stock_quantity), (10, 1))
+
+    def test_takes_and_gives_back_in_one_update(self):
+        taken, returned = create_variants(5, 0)
+        # The UPDATE, inside a savepoint.
+        with self.assertNumQueries(3):
+            adjust_stock({taken.pk: 2, returned.pk: -4})
+        taken.refresh_from_db()
+        returned.refresh_from_db()
+        self.assertEqual((taken.stock_quantity, returned.stock_quantity), (3, 4))
+
+    def test_listing_follows_stock_on_commit(self):
+        (variant,) = create_variants(5)
+        with self.captureOnCommitCallbacks(execute=True):
+            adjust_stock({variant.pk: 5})
+        listing = ProductListing.objects.get(product_id=variant.product_id)
+        self.assertEqual(listing.total_stock, 0)
+
+    def test_lists_are_invalidated_when_stock_runs_out_or_returns(self):
+        (variant,) = create_variants(5)
+        namespaces = [
+            "products",
+            "featured-products",
+            f"product:{variant.product.slug}",
+        ]
+
+        for delta, lists_bumped in ((3, False), (2, True), (-1, True), (-1, False)):
+            with self.subTest(delta=delta):
+                before = get_namespace_versions(namespaces)
+                with self.captureOnCommitCallbacks(execute=True):
+                    adjust_stock({variant.pk: delta})
+                after = get_namespace_versions(namespaces)
+                self.assertEqual(before[:2] != after[:2], lists_bumped)
+                self.assertNotEqual(before[2], after[2])
+
+
+class CartTotalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(
+            get_user_model().objects.create_user("ada", password="secret")
+        )
+
+    def create_cart(self, prices_and_quantities):
+        """The logged-in session's cart, one line per (price, quantity)."""
+        cart = Cart.objects.create(session_key=self.client.session.session_key)
+        variants = create_variants(*[10] * len(prices_and_quantities))
+        for variant, (price, quantity) in zip(variants, prices_and_quantities):
+            variant.price = price
+            variant.save()
+            CartItem.objects.create(
+                cart=cart, product_variant=variant, quantity=quantity
+            )
+        return cart
+
+    def test_sql_totals_equal_python_totals(self):
+        cart = self.create_cart(
+            [("19.99", 3), ("0.10", 7), ("3.33", 1), ("1234.56", 2), ("0.01", 9)]
+        )
+
+        annotated = Cart.objects.with_totals().get(pk=cart.pk)
+        plain = Cart.objects.get(pk=cart.pk)
+        self.assertIsInstance(annotated.total_price, Decimal)
+        self.assertEqual(str(annotated.total_price), str(plain.total_price))
+        self.assertEqual(str(annotated.total_price), "2533.21")
+        self.assertEqual(annotated.total_items, plain.total_items)
+
+        for item in CartItem.objects.with_line_totals().filter(cart=cart):
+            python_total = CartItem.objects.get(pk=item.pk).total_price
+            self.assertEqual(str(item.total_price), str(python_total))
+
+    def render_cart(self, line_count):
+        self.create_cart([("9.99", 2)] * line_count)
+        # The user, the cart with its totals, and its lines.
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/carts/")
+        self.assertEqual(len(response.json()["items"]), line_count)
+        self.assertEqual(
+            response.json()["total_price"], str(Decimal("19.98") * line_count)
+        )
+
+    def test_single_line_cart_query_count(self):
+        self.render_cart(1)
+
+    def test_many_line_cart_query_count(self):
+        self.render_cart(6)
+
+
+class AnonymousCartStorageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_carts_fall_back_to_the_database(self):
+        (variant,) = create_variants(5)
+        response = self.client.post(
+            "/api/carts/items/",
+            {"product_variant_id": variant.pk, "quantity": 2},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        cart = Cart.objects.get(session_key=self.client.session.session_key)
+        self.assertEqual(cart.items.get().quantity, 2)
+        self.assertNotIn(settings.ANONYMOUS_CART_COOKIE_NAME, response.cookies)
+
+    def test_cart_cache_must_exist_and_keep_its_entries(self):
+        with override_settings(**CACHE_CART_SETTINGS):
+            self.assertEqual(
+                [error.id for error in check_anonymous_cart_cache(None)],
+                ["carts.E002"],
+            )
+        with override_settings(
+            ANONYMOUS_CART_STORAGE="carts.storage.CacheCartStorage",
+            ANONYMOUS_CART_CACHE="missing",
+        ):
+            self.assertEqual(
+                [error.id for error in check_anonymous_cart_cache(None)],
+                ["carts.E001"],
+            )
+        with override_settings(
+            CACHES={
+                **settings.CACHES,
+                "carts": {"BACKEND": "django.core.cache.backends.redis.RedisCache"},
+            },
+            ANONYMOUS_CART_STORAGE="carts.storage.CacheCartStorage",
+        ):
+            self.assertEqual(check_anonymous_cart_cache(None), [])
+        self.assertEqual(check_anonymous_cart_cache(None), [])
+
+
+class CartConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.variant, self.other = create_variants(5, 5)
+        for variant in (self.variant, self.other):
+            self.add_item(variant)
+
+    def add_item(self, variant, **headers):
+        response = self.client.post(
+            "/api/carts/items/",
+            {"product_variant_id": variant.pk, "quantity": 1},
+            content_type="application/json",
+            headers=headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def get_cart(self, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get("/api/carts/", headers=headers)
+
+    def test_unchanged_cart_is_not_modified(self):
+        etag = self.get_cart()["ETag"]
+        response = self.get_cart(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_variant_changes_are_modifications(self):
+        etag = self.get_cart()["ETag"]
+        self.variant.price = "12.00"
+        self.variant.save()
+
+        response = self.get_cart(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["total_price"], "22.00")
+
+    def test_deleted_variants_are_modifications(self):
+        etag = self.get_cart()["ETag"]
+        self.other.delete()
+
+        response = self.get_cart(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["items"]), 1)
+
+    def test_minimal_response_is_a_delta(self):
+        response = self.add_item(self.variant, Prefer="return=minimal")
+        self.assertEqual(response["Preference-Applied"], "return=minimal")
+        delta = response.json()
+        self.assertEqual(delta["item"]["quantity"], 2)
+        self.assertEqual(delta["total_items"], 3)
+        self.assertEqual(delta["total_price"], "30.00")
+        self.assertNotIn("items", delta)
+        # The delta's ETag is the cart's.
+        self.assertEqual(self.get_cart(response["ETag"]).status_code, 304)
+
+
+@override_settings(**CACHE_CART_SETTINGS)
+class CacheCartConditionalGetTests(CartConditionalGetTests):
+    pass
+
+
+class PurgeAbandonedSessionsTests(TestCase):
+    def create_session(self, expired=False):
+        session = SessionStore()
+        session.create()
+        if expired:
+            Session.objects.filter(session_key=session.session_key).update(
+                expire_date=timezone.now() - timedelta(days=1)
+            )
+        return session.session_key
+
+    def test_expired_sessions_and_their_carts_are_purged(self):
+        (variant,) = create_variants(5)
+        live_key = self.create_session()
+        expired_key = self.create_session(expired=True)
+        live = Cart.objects.create(session_key=live_key)
+        live.items.create(product_variant=variant)
+        expired_empty = Cart.objects.create(session_key=expired_key)
+        orphaned = Cart.objects.create(session_key="gone")
+        orphaned.items.create(product_variant=variant)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("purge_abandoned_sessions", batch_size=1, stdout=StringIO())
+
+        self.assertEqual(
+            list(Session.objects.values_list("session_key", flat=True)), [live_key]
+        )
+        self.assertFalse(Cart.objects.filter(pk=expired_empty.pk).exists())
+        orphaned.refresh_from_db()
+        self.assertEqual(orphaned.status, Cart.Status.ABANDONED)
+        live.refresh_from_db()
+        self.assertEqual(live.status, Cart.Status.ACTIVE)
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.cache")
+    def test_sessions_outside_the_database_are_refused(self):
+        cart = Cart.objects.create(session_key="in-the-cache")
+        with self.assertRaises(CommandError):
+            call_command("purge_abandoned_sessions", stdout=StringIO())
+        self.assertTrue(Cart.objects.filter(pk=cart.pk).exists())
+
+    def test_sessions_are_only_created_for_a_cart(self):
+        (variant,) = create_variants(5)
+        response = self.client.get("/api/carts/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertFalse(Session.objects.exists())
+        self.assertFalse(Cart.objects.exists())
+
+        self.client.post(
+            "/api/carts/items/",
+            {"product_variant_id": variant.pk, "quantity": 1},
+            content_type="application/json",
+        )
+        self.assertTrue(
+            Session.objects.filter(
+                session_key=self.client.cookies[settings.SESSION_COOKIE_NAME].value
+            ).exists()
+        )
+
+
+@override_settings(**CACHE_CART_SETTINGS)
+class PromoteAnonymousCartTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.plenty, self.scarce = create_variants(10, 1)
+        storage = CacheCartStorage(RequestFactory().get("/"))
+        storage.add_item(self.plenty.pk, 2)
+        storage.add_item(self.scarce.pk, 1)
+        self.token = storage.token
+
+    def get_request(self):
+        request = RequestFactory().get("/")
+        request.COOKIES[settings.ANONYMOUS_CART_COOKIE_NAME] = self.token
+        request.session = SessionStore()
+        request.user = AnonymousUser()
+        return request
+
+    def get_anonymous_lines(self, request):
+        return CacheCartStorage(request).get_lines()
+
+    def test_failed_write_keeps_the_anonymous_cart(self):
+        request = self.get_request()
+        with mock.patch.object(
+            DatabaseCartStorage, "apply_batch", side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                promote_anonymous_cart(request)
+
+        self.assertEqual(
+            self.get_anonymous_lines(request), {self.plenty.pk: 2, self.scarce.pk: 1}
+        )
+        self.assertNotIn(DATABASE_CART_SESSION_KEY, request.session)
+
+    def test_lines_stock_cannot_cover_are_returned_as_errors(self):
+        request = self.get_request()
+        adjust_stock({self.scarce.pk: 1})
+
+        errors = promote_anonymous_cart(request)
+        self.assertEqual(
+            [error["product_variant_id"] for error in errors], [self.scarce.pk]
+        )
+        # The session now shows exactly what checkout would order.
+        self.assertEqual(self.get_anonymous_lines(request), {})
+        self.assertTrue(request.session[DATABASE_CART_SESSION_KEY])
+        self.assertIsInstance(get_cart_storage(request), DatabaseCartStorage)
+        cart = Cart.objects.get(session_key=request.session.session_key)
+        self.assertEqual(
+            dict(cart.items.values_list("product_variant_id", "quantity")),
+            {self.plenty.pk: 2},
+        )
+
+    def test_existing_database_cart_becomes_the_sessions_cart(self):
+        request = self.get_request()
+        request.session.create()
+        Cart.objects.create(session_key=request.session.session_key)
+        CacheCartStorage(request).clear()
+
+        self.assertEqual(promote_anonymous_cart(request), [])
+        self.assertTrue(request.session[DATABASE_CART_SESSION_KEY])
+
+    def test_nothing_to_promote(self):
+        request = self.get_request()
+        CacheCartStorage(request).clear()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(promote_anonymous_cart(request), [])
+        self.assertNotIn(DATABASE_CART_SESSION_KEY, request.session)
+
+    def test_lines_of_deleted_variants_are_dropped(self):
+        request = self.get_request()
+        self.scarce.delete()
+
+        errors = promote_anonymous_cart(request)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(self.get_anonymous_lines(request), {})
+        self.assertTrue(request.session[DATABASE_CART_SESSION_KEY])
+
+
+# Commits run for real here; the placeholder images have no renditions to make.
+@mock.patch("common.renditions.generate_renditions_on_commit")
+class ConcurrentReservationTests(TransactionTestCase):
+    """Carts racing for the last units, each in its own connection."""
+
+    workers = 12
+    stock = 3
+
+    def setUp(self):
+        cache.clear()
+
+    def test_last_units_are_never_oversold(self, generate_renditions_on_commit):
+        (variant,) = create_variants(self.stock)
+        carts = [
+            Cart.objects.create(session_key=f"session-{index}")
+            for index in range(self.workers)
+        ]
+        barrier = threading.Barrier(self.workers)
+        results = []
+
+        def reserve(cart):
+            try:
+                barrier.wait()
+                reserve_stock(cart, {variant.pk: 1})
+                results.append(True)
+            except InsufficientStockError:
+                results.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=reserve, args=(cart,)) for cart in carts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        variant.refresh_from_db()
+        reserved = sum(
+            StockReservation.objects.filter(product_variant=variant).values_list(
+                "quantity", flat=True
+            )
+        )
+        self.assertEqual(len(results), self.workers)
+        self.assertEqual(results.count(True), self.stock)
+        self.assertEqual(variant.stock_quantity, 0)
+        self.assertEqual(reserved, self.stock)
+
+
+# Commits run for real here; the placeholder images have no renditions to make.
+@mock.patch("common.renditions.generate_renditions_on_commit")
+class ConcurrentCartMutationTests(TransactionTestCase):
+    """Batches and single-line edits of one cart, from several connections."""
+
+    workers = 8
+    rounds = 10
+
+    def setUp(self):
+        cache.clear()
+
+    def test_mutations_of_one_cart_never_deadlock(self, generate_renditions_on_commit):
+        variants = create_variants(1000, 1000)
+        session = SessionStore()
+        session.create()
+
+        def get_storage():
+            request = RequestFactory().get("/")
+            request.session = SessionStore(session_key=session.session_key)
+            return DatabaseCartStorage(request)
+
+        item_id = get_storage().add_item(variants[0].pk, 1)
+        barrier = threading.Barrier(self.workers)
+        errors = []
+
+        def mutate(index):
+            storage = get_storage()
+            try:
+                barrier.wait()
+                for quantity in range(1, self.rounds + 1):
+                    if index % 2:
+                        storage.update_item(item_id, quantity)
+                        storage.add_item(variants[1].pk, 1)
+                    else:
+                        storage.apply_batch(
+                            [
+                                {
+                                    "product_variant_id": variant.pk,
+                                    "quantity": quantity,
+                                    "op": CartBatchOperationSerializer.Op.SET,
+                                }
+                                for variant in variants
+                            ]
+                        )
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=mutate, args=(index,))
+            for index in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
@@ -1,115 +1,126 @@
-from django.db import transaction
-from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from .models import Cart, CartItem
+from .reservations import InsufficientStockError
 from .serializers import (
+    CartBatchSerializer,
+    CartDeltaSerializer,
     CartItemAddSerializer,
     CartItemUpdateSerializer,
     CartSerializer,
 )
+from .storage import get_cart_storage
 
 
 class CartViewSet(viewsets.GenericViewSet):
-    serializer_class = CartSerializer
-
-    def get_session_key(self, request):
-        if not request.session.exists(request.session.session_key):
-            request.session.create()
-        return request.session.session_key
-
-    def get_cart(self, request, prefetch_items=True):
-        session_key = self.get_session_key(request)
+    """
+    The session's cart. Where it is kept depends on the visitor, see
+    get_cart_storage; responses are the same either way.
+    """
 
-        cart_qs = Cart.objects.filter(
-            session_key=session_key, status=Cart.Status.ACTIVE
-        )
-
-        if prefetch_items:
-            cart_qs = cart_qs.prefetch_related(
-                "items",
-                "items__product_variant",
-                "items__product_variant__product",
-            )
+    serializer_class = CartSerializer
 
-        cart = cart_qs.first()
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.storage = get_cart_storage(request)
 
-        if not cart:
-            cart = Cart.objects.create(
-                session_key=session_key, status=Cart.Status.ACTIVE
-            )
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if hasattr(self, "storage"):
+            response = self.storage.process_response(response)
+        return response
 
-        return cart
+    def wants_minimal_response(self, request):
+        return "return=minimal" in request.headers.get("Prefer", "")
 
     def list(self, request, *args, **kwargs):
-        cart = self.get_cart(request, prefetch_items=True)
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            # Answer a conditional GET from the version alone.
+            version = self.storage.get_version()
+            if version is not None:
+                etag = self.storage.get_etag(version)
+                if etag in parse_etags(if_none_match):
+                    return Response(
+                        status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+                    )
+
+        cart = self.storage.get_cart()
         serializer = self.get_serializer(cart)
-        return Response(serializer.data)
+        return Response(
+            serializer.data, headers={"ETag": self.storage.get_etag(cart.version)}
+        )
+
+    def get_mutation_response(self, request, item_id):
+        """
+        The full cart, or with 'Prefer: return=minimal' only the changed line,
+        the new totals and the version (see CartDeltaSerializer).
+        """
+        if not self.wants_minimal_response(request):
+            return self.list(request)
+
+        delta = self.storage.get_delta(item_id)
+        serializer = CartDeltaSerializer(delta, context=self.get_serializer_context())
+        return Response(
+            serializer.data,
+            headers={
+                "ETag": self.storage.get_etag(delta["version"]),
+                "Preference-Applied": "return=minimal",
+            },
+        )
 
     @action(detail=False, methods=["post"], url_path="items")
     def add_item(self, request):
-        cart = self.get_cart(request, prefetch_items=False)
-
         serializer = CartItemAddSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        variant_id = serializer.validated_data["product_variant_id"]
-        quantity = serializer.validated_data["quantity"]
-
-        with transaction.atomic():
-            cart_item, created = CartItem.objects.select_for_update().get_or_create(
-                cart=cart,
-                product_variant_id=variant_id,
-                defaults={"quantity": 0},
+        try:
+            item_id = self.storage.add_item(
+                serializer.validated_data["product_variant_id"],
+                serializer.validated_data["quantity"],
+            )
+        except InsufficientStockError as e:
+            return Response(
+                {"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST
             )
 
-            new_quantity = cart_item.quantity + quantity
-
-            if new_quantity > cart_item.product_variant.stock_quantity:
-                return Response(
-                    {
-                        "error": f"Only {cart_item.product_variant.stock_quantity} in stock."
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            cart_item.quantity = new_quantity
-            cart_item.save()
-
-        return self.list(request)
+        return self.get_mutation_response(request, item_id)
 
     @action(detail=True, methods=["patch"], url_path="update")
     def update_item_quantity(self, request, pk=None):
         serializer = CartItemUpdateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        new_quantity = serializer.validated_data["quantity"]
-
-        session_key = self.get_session_key(request)
 
-        with transaction.atomic():
-            cart_item = get_object_or_404(
-                CartItem.objects.select_for_update(),
-                pk=pk,
-                cart__session_key=session_key,
+        try:
+            self.storage.update_item(pk, serializer.validated_data["quantity"])
+        except InsufficientStockError as e:
+            return Response(
+                {"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST
             )
 
-            if new_quantity > cart_item.product_variant.stock_quantity:
-                return Response(
-                    {"error": "Not enough stock."}, status=status.HTTP_400_BAD_REQUEST
-                )
-
-            cart_item.quantity = new_quantity
-            cart_item.save()
-
-        return self.list(request)
+        return self.get_mutation_response(request, int(pk))
 
     @action(detail=True, methods=["delete"], url_path="remove")
     def remove_item(self, request, pk=None):
-        session_key = self.get_session_key(request)
+        self.storage.remove_item(pk)
+        return self.get_mutation_response(request, int(pk))
+
+    @action(detail=False, methods=["post"], url_path="batch")
+    def batch(self, request):
+        """
+        Apply a list of {product_variant_id, quantity, op} operations in one
+        transaction and return the final cart once.
+        - 'add' adds to the line, 'set' replaces its quantity, 'remove' drops it
+        - Operations on unknown variants or short stock are reported in
+          'errors' by their index; the valid ones are still applied
+        """
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-        cart_item = get_object_or_404(CartItem, pk=pk, cart__session_key=session_key)
-        cart_item.delete()
+        errors = self.storage.apply_batch(serializer.validated_data["operations"])
 
-        return self.list(request)
+        response = self.list(request)
+        response.data["errors"] = errors
+        return response
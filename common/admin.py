@@ -0,0 +1,13 @@
+from common.renditions import render_renditions_inline
+
+
+class RenditionsAdminMixin:
+    """
+    Renders the renditions of the images a change form saves before
+    redirecting, so the API never advertises renditions that aren't written
+    yet for an image just uploaded.
+    """
+
+    def changeform_view(self, *args, **kwargs):
+        with render_renditions_inline():
+            return super().changeform_view(*args, **kwargs)
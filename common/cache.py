@@ -0,0 +1,109 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from common.timing import record_cache_lookup
+
+
+def _version_key(namespace):
+    return f"response-version:{namespace}"
+
+
+def _modified_key(namespace):
+    return f"response-modified:{namespace}"
+
+
+def get_namespace_versions(namespaces):
+    """
+    Return the current version of every namespace in a single cache round trip.
+    Missing versions are seeded from the clock, so a version lost to eviction
+    can never collide with one that was handed out earlier.
+    """
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+
+    return [versions[key] for key in keys]
+
+
+def get_namespace_validators(namespaces):
+    """
+    Return the versions of the namespaces and the Unix time any of them was
+    last bumped, in a single cache round trip. Missing values are seeded from
+    the clock, which can only make a response look newer than it is.
+    """
+    version_keys = [_version_key(namespace) for namespace in namespaces]
+    modified_keys = [_modified_key(namespace) for namespace in namespaces]
+    values = cache.get_many(version_keys + modified_keys)
+
+    missing = {key: time.time_ns() for key in version_keys if key not in values}
+    now = time.time()
+    missing.update({key: now for key in modified_keys if key not in values})
+    if missing:
+        cache.set_many(missing, timeout=None)
+        values.update(missing)
+
+    return (
+        [values[key] for key in version_keys],
+        max(values[key] for key in modified_keys),
+    )
+
+
+def bump_namespaces(*namespaces):
+    """
+    Invalidate every cached response in the given namespaces by moving their
+    version forward. Old entries are never read again and simply expire.
+    """
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+    now = time.time()
+    cache.set_many(
+        {_modified_key(namespace): now for namespace in namespaces}, timeout=None
+    )
+
+
+def invalidate_on_commit(*namespaces):
+    """
+    Bump the namespaces once the surrounding transaction commits, so a request
+    racing the write can't repopulate the cache with the old rows.
+    """
+    transaction.on_commit(lambda: bump_namespaces(*namespaces))
+
+
+def get_response_cache_key(request, namespaces):
+    versions = get_namespace_versions(namespaces)
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    stamp = ".".join(str(version) for version in versions)
+    return f"response:{'|'.join(namespaces)}:{stamp}:{url}"
+
+
+def get_or_set_versioned(key, namespaces, default, timeout=None):
+    """
+    Like cache.get_or_set(), but the entry is tied to the current version of
+    the given namespaces and is recomputed once any of them is bumped. Without
+    RESPONSE_CACHE_ENABLED the value is computed every time.
+    """
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return default()
+
+    versions = get_namespace_versions(namespaces)
+    versioned_key = f"{key}:{'.'.join(str(version) for version in versions)}"
+
+    value = cache.get(versioned_key)
+    record_cache_lookup(hit=value is not None)
+    if value is None:
+        value = default()
+        cache.set(versioned_key, value, timeout)
+    return value
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Backends whose entries aren't shared between processes.
+PROCESS_LOCAL_CACHE_BACKENDS = {
+    "django.core.cache.backends.dummy.DummyCache",
+    "django.core.cache.backends.locmem.LocMemCache",
+}
+
+
+@register()
+def check_response_cache(app_configs, **kwargs):
+    """Namespace versions must be seen by every process to invalidate anything."""
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return []
+
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend in PROCESS_LOCAL_CACHE_BACKENDS:
+        return [
+            Error(
+                f"RESPONSE_CACHE_ENABLED needs a shared cache, not {backend}.",
+                hint="Set DJANGO_REDIS_URL, or DJANGO_RESPONSE_CACHE_ENABLED=False.",
+                id="common.E001",
+            )
+        ]
+    return []
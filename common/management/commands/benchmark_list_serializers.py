@@ -0,0 +1,95 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from products.serializers import (
+    CollectionSerializer,
+    CollectionValuesSerializer,
+    ProductListSerializer,
+    ProductListValuesSerializer,
+)
+from products.views import CollectionListView, ProductViewSet
+from sections.serializers import (
+    FeaturedCategorySerializer,
+    FeaturedCategoryValuesSerializer,
+    FeaturedProductSerializer,
+    FeaturedProductValuesSerializer,
+)
+from sections.views import FeaturedCategoryListView, FeaturedProductsListView
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the list serializers against their .values() twins on the same "
+        "rows (their parity is tested in products.tests and sections.tests)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, default=100, help="Rows per list (a page)"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Serializations per measurement"
+        )
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        request = RequestFactory(HTTP_HOST=settings.ALLOWED_HOSTS[0]).get("/")
+        context = {"request": request}
+
+        benchmarks = [
+            (
+                "products",
+                ProductViewSet.queryset.select_related("listing")[:rows],
+                ProductListSerializer,
+                ProductListValuesSerializer,
+            ),
+            (
+                "collections",
+                CollectionListView().get_queryset()[:rows],
+                CollectionSerializer,
+                CollectionValuesSerializer,
+            ),
+            (
+                "featured-products",
+                FeaturedProductsListView()
+                .get_queryset()
+                .select_related("product__listing")[:rows],
+                FeaturedProductSerializer,
+                FeaturedProductValuesSerializer,
+            ),
+            (
+                "featured-categories",
+                FeaturedCategoryListView().get_queryset().select_related("category"),
+                FeaturedCategorySerializer,
+                FeaturedCategoryValuesSerializer,
+            ),
+        ]
+
+        self.stdout.write(
+            f"{'list':>20} {'rows':>6} {'model ms':>10} {'values ms':>10}"
+        )
+        for name, queryset, serializer_class, values_serializer_class in benchmarks:
+            instances = list(queryset)
+            values = list(values_serializer_class.get_queryset(queryset))
+
+            def serialize_instances():
+                return serializer_class(instances, many=True, context=context).data
+
+            def serialize_values():
+                return values_serializer_class(values, many=True, context=context).data
+
+            self.stdout.write(
+                f"{name:>20} {len(values):>6} "
+                f"{self.measure(serialize_instances, options['repeat']):>10.2f} "
+                f"{self.measure(serialize_values, options['repeat']):>10.2f}"
+            )
+
+    def measure(self, serialize, repeat):
+        """Mean milliseconds per serialization of the whole list."""
+        start = time.perf_counter()
+        for _ in range(repeat):
+            serialize()
+        return (time.perf_counter() - start) * 1000 / repeat
@@ -0,0 +1,74 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from common.renditions import generate_renditions
+from products.models import (
+    Category,
+    Collection,
+    Product,
+    ProductGalleryImage,
+    ProductVariant,
+)
+from sections.models import FeaturedCategory, FeaturedProduct
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FIELDS = [
+    (Product, "thumbnail"),
+    (ProductVariant, "image"),
+    (ProductGalleryImage, "image"),
+    (Category, "image"),
+    (Collection, "image"),
+    (FeaturedProduct, "image"),
+    (FeaturedCategory, "image"),
+]
+
+
+class Command(BaseCommand):
+    help = "Generate the missing image renditions of every stored image"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of threads generating renditions",
+        )
+
+    def handle(self, *args, **options):
+        names = set()
+        for model, field_name in IMAGE_FIELDS:
+            names.update(
+                model.objects.exclude(**{field_name: ""})
+                .exclude(**{f"{field_name}__isnull": True})
+                .values_list(field_name, flat=True)
+            )
+
+        generated_count = 0
+        failed_count = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            for result in pool.map(self.generate, names):
+                if result is None:
+                    failed_count += 1
+                else:
+                    generated_count += result
+
+        logger.info(
+            f"Generated {generated_count} renditions for {len(names)} images, "
+            f"{failed_count} failed"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {generated_count} renditions for {len(names)} images, "
+                f"{failed_count} failed"
+            )
+        )
+
+    def generate(self, name):
+        try:
+            return generate_renditions(name)
+        except Exception as e:
+            logger.error(f"Failed to generate renditions for {name}: {e}")
+            return None
@@ -0,0 +1,84 @@
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from common.timing import RequestTiming
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentationMiddleware:
+    """
+    Records, for a sample of requests, the SQL queries, cached payload
+    lookups, serializer time and view time, and reports them as a
+    Server-Timing header and one JSON log line tagged with the view name.
+    - INSTRUMENTATION_SAMPLE_RATE is the share of requests sampled; at 0 the
+      middleware removes itself from the stack
+    - The header is only sent to INTERNAL_IPS and staff users; everyone else
+      is only logged
+    - List it last, so 'view' only covers URL resolution, the view and
+      response rendering
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.INSTRUMENTATION_SAMPLE_RATE
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timing = RequestTiming()
+        start = time.perf_counter()
+        with timing.activate(), connection.execute_wrapper(timing):
+            response = self.get_response(request)
+        view_time = time.perf_counter() - start
+
+        if self.is_internal(request):
+            # Other middleware (e.g. the debug toolbar) may report timings too.
+            metrics = (
+                [response["Server-Timing"]]
+                if response.has_header("Server-Timing")
+                else []
+            )
+            response["Server-Timing"] = ", ".join(
+                [
+                    *metrics,
+                    f'sql;dur={timing.query_time * 1000:.2f};desc="{timing.query_count} queries"',
+                    f'cache;desc="{timing.cache_hits} hits, {timing.cache_misses} misses"',
+                    f"serialize;dur={timing.serializer_time * 1000:.2f}",
+                    f"view;dur={view_time * 1000:.2f}",
+                ]
+            )
+
+        resolver_match = request.resolver_match
+        logger.info(
+            json.dumps(
+                {
+                    "view": resolver_match.view_name if resolver_match else None,
+                    "method": request.method,
+                    "status": response.status_code,
+                    "queries": timing.query_count,
+                    "sql_ms": round(timing.query_time * 1000, 2),
+                    "cache_hits": timing.cache_hits,
+                    "cache_misses": timing.cache_misses,
+                    "serialize_ms": round(timing.serializer_time * 1000, 2),
+                    "view_ms": round(view_time * 1000, 2),
+                }
+            )
+        )
+        return response
+
+    def is_internal(self, request):
+        """Whether the request may see backend timings in its response."""
+        if request.META.get("REMOTE_ADDR") in settings.INTERNAL_IPS:
+            return True
+        user = getattr(request, "user", None)
+        return user is not None and user.is_staff
@@ -1,4 +1,18 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.views.generic.base import ContextMixin
+from rest_framework import status
+from rest_framework.response import Response
+
+from common.cache import get_namespace_validators, get_response_cache_key
+from common.serializers import ValuesSerializer
+from common.timing import record_cache_lookup
 
 
 class TitleMixin(ContextMixin):
@@ -15,3 +29,134 @@ class TitleMixin(ContextMixin):
         context = super().get_context_data(**kwargs)
         context["title"] = self.get_title()
         return context
+
+
+class CachedResponseMixin:
+    """
+    Caches the serialized payload of read-only list/retrieve actions.
+    - Use 'self.cache_namespaces' for static namespaces
+    - Or, override 'get_cache_namespaces()' for per-object namespaces
+
+    Entries are keyed on the full URL plus the current version of every
+    namespace, so bumping a namespace (see common.cache) invalidates them.
+    Nothing is cached without RESPONSE_CACHE_ENABLED.
+    """
+
+    cache_namespaces = ()
+
+    def get_cache_namespaces(self):
+        return list(self.cache_namespaces)
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        namespaces = self.get_cache_namespaces()
+        if not namespaces or not settings.RESPONSE_CACHE_ENABLED:
+            return handler(request, *args, **kwargs)
+
+        key = get_response_cache_key(request, namespaces)
+        data = cache.get(key)
+        record_cache_lookup(hit=data is not None)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
+
+
+class ValuesSerializerMixin:
+    """
+    Lets list views use a ValuesSerializer (see common.serializers): the
+    filtered queryset is narrowed to the serializer's .values() lookups
+    before pagination, so no model instances are built.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, ValuesSerializer):
+            return serializer_class.get_queryset(queryset)
+        return queryset
+
+
+class ConditionalResponse(Exception):
+    """Raised by ConditionalGetMixin to answer a request before its handler runs."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GETs for read-only views whose payload only changes when one
+    of its cache namespaces (see common.cache) is bumped.
+    - Use 'self.cache_namespaces' or override 'get_cache_namespaces()', as
+      with CachedResponseMixin
+    - The ETag hashes the URL with the namespace versions and Last-Modified
+      is the last bump, so validating costs no query and a 304 is sent
+      before the handler runs
+    - Last-Modified is left out during the second of the last bump, which a
+      later bump could still share
+    - Responses carry the Cache-Control header from 'get_cache_control()'
+    - Without RESPONSE_CACHE_ENABLED the namespace versions can't be trusted,
+      so responses are sent without validators
+    """
+
+    cache_namespaces = ()
+
+    def get_cache_namespaces(self):
+        return list(self.cache_namespaces)
+
+    def get_cache_control(self):
+        return {"public": True, "max_age": settings.CATALOG_CACHE_MAX_AGE}
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.validators = None
+
+        namespaces = self.get_cache_namespaces()
+        if (
+            request.method not in ("GET", "HEAD")
+            or not namespaces
+            or not settings.RESPONSE_CACHE_ENABLED
+        ):
+            return
+
+        versions, bumped_at = get_namespace_validators(namespaces)
+        stamp = ".".join(str(version) for version in versions)
+        digest = hashlib.md5(
+            f"{request.build_absolute_uri()}:{stamp}".encode()
+        ).hexdigest()
+        # HTTP dates are whole seconds: rounding up keeps the bump inside
+        # them, and once that second is over any later bump gets a later one.
+        last_modified = math.ceil(bumped_at)
+        if last_modified > time.time():
+            last_modified = None
+        self.validators = (f'W/"{digest}"', last_modified)
+
+        response = get_conditional_response(
+            request, etag=self.validators[0], last_modified=self.validators[1]
+        )
+        if response is not None:
+            raise ConditionalResponse(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ConditionalResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, "validators", None) and response.status_code in (200, 304):
+            etag, last_modified = self.validators
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+            patch_cache_control(response, **self.get_cache_control())
+        return response
@@ -1,4 +1,7 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.utils.text import slugify
+
+from common.utils import get_unique_slug
 
 
 # Create your models here.
@@ -15,3 +18,60 @@ class OrderableModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class LoadedValuesMixin:
+    """
+    Keeps the stored value of every loaded field in '_loaded_values', so
+    signal handlers can tell what a save changed. Refreshed after each save,
+    once the handlers have run.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+        update_fields = kwargs.get("update_fields")
+        loaded_values = getattr(self, "_loaded_values", {})
+        for field in self._meta.concrete_fields:
+            if update_fields is None or field.name in update_fields:
+                loaded_values[field.attname] = field.get_prep_value(
+                    getattr(self, field.attname)
+                )
+        self._loaded_values = loaded_values
+
+
+class UniqueSlugMixin:
+    """
+    Fills an empty 'slug' from 'slug_populate_from' on save.
+    If a concurrent save claims the same slug first, the unique constraint
+    rejects the insert and a fresh slug is allocated and retried.
+    """
+
+    slug_populate_from = "title"
+    slug_max_attempts = 3
+
+    def save(self, *args, **kwargs):
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        for attempt in range(1, self.slug_max_attempts + 1):
+            self.slug = get_unique_slug(
+                self.__class__, slugify(getattr(self, self.slug_populate_from)), self
+            )
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                slug_taken = (
+                    self.__class__.objects.filter(slug=self.slug)
+                    .exclude(pk=self.pk)
+                    .exists()
+                )
+                if not slug_taken or attempt == self.slug_max_attempts:
+                    raise
@@ -0,0 +1,172 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+from pilkit.processors import ResizeToFit, Transpose
+from pilkit.utils import save_image
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Rendition widths, narrowest first.
+RENDITION_WIDTHS = {"thumb": 320, "card": 640, "detail": 1280, "zoom": 2400}
+
+# Output formats by file extension, best compression first; JPEG is the fallback.
+RENDITION_FORMATS = {"avif": "AVIF", "webp": "WEBP", "jpg": "JPEG"}
+
+RENDITION_OPTIONS = {"quality": 80}
+
+_executor = None
+
+# Set by render_renditions_inline().
+_render_inline = ContextVar("render_renditions_inline", default=False)
+
+
+def get_rendition_name(source_name, rendition, extension):
+    """
+    'renditions/<source name without extension>/<rendition>.<extension>'.
+    Upload names are unique, so the name only depends on the source name and
+    URLs can be built without touching storage.
+    """
+    root, _ = os.path.splitext(source_name)
+    return f"renditions/{root}/{rendition}.{extension}"
+
+
+def get_rendition_urls(field_file, request=None):
+    """
+    srcset-style map for an image field: one srcset string per format plus
+    'src', the JPEG card rendition for clients without srcset support.
+    URLs are absolute when a request is given. Files aren't checked for: the
+    admin renders them as it saves (see render_renditions_inline).
+    """
+    if not field_file:
+        return None
+
+    def url(name):
+        url = field_file.storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    src = url(get_rendition_name(field_file.name, "card", "jpg"))
+
+    # The renditions share a directory. When the URL of a file is the
+    # directory URL plus its file name (nothing signed or appended), the
+    # directory is resolved once instead of once per rendition.
+    directory = get_rendition_name(field_file.name, "", "").rpartition("/")[0]
+    directory_url = url(f"{directory}/")
+    shared_directory = src == f"{directory_url}card.jpg"
+
+    def rendition_url(rendition, extension):
+        if shared_directory:
+            return f"{directory_url}{rendition}.{extension}"
+        return url(get_rendition_name(field_file.name, rendition, extension))
+
+    urls = {"src": src}
+    for extension in RENDITION_FORMATS:
+        urls[extension] = ", ".join(
+            f"{rendition_url(rendition, extension)} {width}w"
+            for rendition, width in RENDITION_WIDTHS.items()
+        )
+    return urls
+
+
+def generate_renditions(name, storage=default_storage):
+    """
+    Write every missing rendition of the stored image 'name'.
+    The source is decoded once; each width is resized from the next wider one.
+    Returns the number of files written.
+    """
+    missing = {
+        (rendition, extension): target
+        for rendition in RENDITION_WIDTHS
+        for extension in RENDITION_FORMATS
+        if not storage.exists(target := get_rendition_name(name, rendition, extension))
+    }
+    if not missing:
+        return 0
+
+    with storage.open(name) as f:
+        image = Transpose().process(Image.open(f))
+        image.load()
+
+    for rendition, width in reversed(RENDITION_WIDTHS.items()):
+        image = ResizeToFit(width=width, upscale=False).process(image)
+        for extension, image_format in RENDITION_FORMATS.items():
+            target = missing.get((rendition, extension))
+            if target is None:
+                continue
+            buffer = BytesIO()
+            save_image(image, buffer, image_format, dict(RENDITION_OPTIONS))
+            storage.save(target, ContentFile(buffer.getvalue()))
+
+    return len(missing)
+
+
+def get_rendition_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_RENDITION_WORKERS,
+            thread_name_prefix="renditions",
+        )
+    return _executor
+
+
+def _generate_renditions_or_log(name, storage):
+    try:
+        generate_renditions(name, storage)
+    except Exception:
+        logger.exception(f"Failed to generate renditions for {name}")
+
+
+@contextmanager
+def render_renditions_inline():
+    """
+    Renditions queued within the block are generated on commit in this thread
+    instead of the worker pool, so they exist before the response is sent.
+    """
+    token = _render_inline.set(True)
+    try:
+        yield
+    finally:
+        _render_inline.reset(token)
+
+
+def generate_renditions_on_commit(name, storage=default_storage):
+    """Generate the renditions of the stored image 'name' in the worker pool."""
+    if not name:
+        return
+
+    if _render_inline.get():
+        transaction.on_commit(lambda: _generate_renditions_or_log(name, storage))
+        return
+
+    transaction.on_commit(
+        lambda: get_rendition_executor().submit(
+            _generate_renditions_or_log, name, storage
+        )
+    )
+
+
+def generate_changed_renditions_on_commit(instance, field_name="image"):
+    """
+    generate_renditions_on_commit for an image field of a model instance,
+    unless its file is the one loaded (see common.models.LoadedValuesMixin).
+    """
+    field_file = getattr(instance, field_name)
+    if field_file.name != getattr(instance, "_loaded_values", {}).get(field_name):
+        generate_renditions_on_commit(field_file.name, field_file.storage)
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Serializes an image field as its rendition URLs (see get_rendition_urls)."""
+
+    def to_representation(self, value):
+        return get_rendition_urls(value, self.context.get("request"))
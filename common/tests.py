@@ -1 +1,350 @@
-# Create your tests here.
+import json
+import math
+import shutil
+import tempfile
+import time
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework.response import Response
+
+from common.cache import bump_namespaces, invalidate_on_commit
+from common.checks import check_response_cache
+from common.middleware import InstrumentationMiddleware
+from common.mixins import CachedResponseMixin
+from common.renditions import (
+    RENDITION_FORMATS,
+    RENDITION_WIDTHS,
+    generate_renditions,
+    generate_renditions_on_commit,
+    get_rendition_name,
+    render_renditions_inline,
+)
+from common.timing import RequestTiming, measure_serialization
+from common.utils import assign_unique_slugs, get_unique_slugs
+from products.models import Collection
+from products.tests import create_catalog
+from products.views import CollectionListView
+
+
+class MeasureSerializationTests(SimpleTestCase):
+    @mock.patch("common.timing.time.perf_counter", side_effect=[10.0, 13.0])
+    def test_nested_blocks_are_counted_once(self, perf_counter):
+        with RequestTiming().activate() as timing:
+            with measure_serialization():
+                with measure_serialization():
+                    pass
+        self.assertEqual(timing.serializer_time, 3.0)
+
+    def test_nothing_is_measured_outside_a_sampled_request(self):
+        with mock.patch("common.timing.time.perf_counter") as perf_counter:
+            with measure_serialization():
+                pass
+        perf_counter.assert_not_called()
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1, INTERNAL_IPS=["127.0.0.1"])
+class InstrumentationMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = create_catalog()[0]
+
+    def setUp(self):
+        cache.clear()
+
+    def get_serialize_ms(self, path):
+        with self.assertLogs("common.middleware") as logs:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("serialize;dur=", response["Server-Timing"])
+        return json.loads(logs.records[-1].getMessage())["serialize_ms"]
+
+    def test_model_serializers_are_timed(self):
+        with override_settings(PRODUCT_DETAIL_SQL_ENABLED=False):
+            self.assertGreater(
+                self.get_serialize_ms(f"/api/products/{self.product.slug}/"), 0
+            )
+
+    def test_values_serializers_are_timed(self):
+        self.assertGreater(self.get_serialize_ms("/api/products/"), 0)
+
+    @override_settings(INTERNAL_IPS=[])
+    def test_timings_are_only_shown_internally(self):
+        with self.assertLogs("common.middleware"):
+            response = self.client.get("/api/products/")
+        self.assertNotIn("Server-Timing", response)
+
+        self.client.force_login(
+            get_user_model().objects.create_user("ada", is_staff=True)
+        )
+        with self.assertLogs("common.middleware"):
+            response = self.client.get("/api/products/")
+        self.assertIn("sql;dur=", response["Server-Timing"])
+
+    def test_sample_rate_of_zero_removes_the_middleware(self):
+        with override_settings(INSTRUMENTATION_SAMPLE_RATE=0):
+            with self.assertRaises(MiddlewareNotUsed):
+                InstrumentationMiddleware(lambda request: None)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class CachedResponseMixinTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.view = CachedResponseMixin()
+        self.view.cache_namespaces = ["things"]
+
+    def get(self, handler):
+        return self.view.get_cached_response(handler, RequestFactory().get("/things/"))
+
+    def test_responses_are_served_from_the_cache(self):
+        handler = mock.Mock(return_value=Response({"things": [1]}))
+        self.get(handler)
+        self.assertEqual(self.get(handler).data, {"things": [1]})
+        self.assertEqual(handler.call_count, 1)
+
+    def test_bumps_invalidate_once_committed(self):
+        handler = mock.Mock(return_value=Response({"things": [1]}))
+        self.get(handler)
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_on_commit("things")
+            self.get(handler)
+            self.assertEqual(handler.call_count, 1)
+        self.get(handler)
+        self.assertEqual(handler.call_count, 2)
+
+    def test_only_ok_responses_are_cached(self):
+        handler = mock.Mock(return_value=Response(status=404))
+        self.get(handler)
+        self.assertEqual(self.get(handler).status_code, 404)
+        self.assertEqual(handler.call_count, 2)
+
+    def test_nothing_is_cached_without_a_shared_cache(self):
+        handler = mock.Mock(return_value=Response({"things": [1]}))
+        with override_settings(RESPONSE_CACHE_ENABLED=False):
+            self.get(handler)
+            self.get(handler)
+        self.assertEqual(handler.call_count, 2)
+
+    def test_response_cache_must_be_shared(self):
+        self.assertEqual(
+            [error.id for error in check_response_cache(None)], ["common.E001"]
+        )
+        with override_settings(
+            CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}
+            }
+        ):
+            self.assertEqual(check_response_cache(None), [])
+        with override_settings(RESPONSE_CACHE_ENABLED=False):
+            self.assertEqual(check_response_cache(None), [])
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class ConditionalGetMixinTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+
+    def setUp(self):
+        cache.clear()
+        self.bumped_at = time.time() - 10
+        with mock.patch("common.cache.time.time", return_value=self.bumped_at):
+            bump_namespaces("collections")
+
+    def get(self, **headers):
+        return self.client.get("/api/products/collections/", headers=headers)
+
+    def assertNotModifiedWithoutWork(self, **headers):
+        with mock.patch.object(CollectionListView, "list") as handler:
+            with self.assertNumQueries(0):
+                response = self.get(**headers)
+        self.assertEqual(response.status_code, 304)
+        handler.assert_not_called()
+
+    def test_matching_etag_is_not_modified(self):
+        self.assertNotModifiedWithoutWork(If_None_Match=self.get()["ETag"])
+
+    def test_matching_date_is_not_modified(self):
+        last_modified = self.get()["Last-Modified"]
+        self.assertEqual(last_modified, http_date(math.ceil(self.bumped_at)))
+        self.assertNotModifiedWithoutWork(If_Modified_Since=last_modified)
+
+    def test_bumps_are_modifications(self):
+        response = self.get()
+        bump_namespaces("collections")
+        response = self.get(
+            If_None_Match=response["ETag"],
+            If_Modified_Since=response["Last-Modified"],
+        )
+        self.assertEqual(response.status_code, 200)
+        # A bump in this very second could still be followed by another.
+        self.assertNotIn("Last-Modified", response)
+        self.assertIn("ETag", response)
+
+    def test_catalog_responses_may_be_cached(self):
+        for path in (
+            "/api/products/categories/",
+            "/api/products/collections/",
+            "/api/sections/home/",
+            "/api/sections/featured-products/",
+            "/api/sections/featured-categories/",
+        ):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response["Cache-Control"],
+                    f"public, max-age={settings.CATALOG_CACHE_MAX_AGE}",
+                )
+
+
+def create_jpeg(width, height):
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), "tan").save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class RenditionTests(TestCase):
+    def setUp(self):
+        self.base_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_path)
+        self.enterContext(override_settings(MEDIA_ROOT=self.base_path))
+        self.storage = FileSystemStorage(location=self.base_path)
+
+    def get_width(self, name, rendition, extension="jpg"):
+        with self.storage.open(get_rendition_name(name, rendition, extension)) as f:
+            return Image.open(f).width
+
+    def test_missing_renditions_are_written_once(self):
+        name = self.storage.save("busts/big.jpg", ContentFile(create_jpeg(3000, 1500)))
+        total = len(RENDITION_WIDTHS) * len(RENDITION_FORMATS)
+
+        self.assertEqual(generate_renditions(name, self.storage), total)
+        for rendition, width in RENDITION_WIDTHS.items():
+            self.assertEqual(self.get_width(name, rendition), width)
+        self.assertEqual(generate_renditions(name, self.storage), 0)
+
+        self.storage.delete(get_rendition_name(name, "card", "webp"))
+        self.assertEqual(generate_renditions(name, self.storage), 1)
+        self.assertEqual(self.get_width(name, "card", "webp"), 640)
+
+    def test_small_images_are_not_upscaled(self):
+        name = self.storage.save("busts/small.jpg", ContentFile(create_jpeg(200, 100)))
+        generate_renditions(name, self.storage)
+        for rendition in RENDITION_WIDTHS:
+            self.assertEqual(self.get_width(name, rendition), 200)
+
+    def test_inline_renditions_are_written_on_commit(self):
+        name = self.storage.save("busts/big.jpg", ContentFile(create_jpeg(800, 400)))
+        with mock.patch("common.renditions.get_rendition_executor") as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                with render_renditions_inline():
+                    generate_renditions_on_commit(name, self.storage)
+                self.assertFalse(
+                    self.storage.exists(get_rendition_name(name, "card", "jpg"))
+                )
+        executor.assert_not_called()
+        self.assertEqual(self.get_width(name, "card"), 640)
+
+    @mock.patch("common.renditions.generate_renditions_on_commit")
+    def test_only_changed_images_are_queued(self, generate_renditions_on_commit):
+        collection = Collection.objects.create(title="Summer", image="a.jpg")
+        collection = Collection.objects.get(pk=collection.pk)
+        collection.title = "Summer sale"
+        collection.save()
+        collection.image = "b.jpg"
+        collection.save()
+        collection.save()
+
+        self.assertEqual(
+            [call.args[0] for call in generate_renditions_on_commit.call_args_list],
+            ["a.jpg", "b.jpg"],
+        )
+
+    def test_admin_uploads_have_their_renditions(self):
+        self.client.force_login(
+            get_user_model().objects.create_superuser("ada", password="secret")
+        )
+        with mock.patch(
+            "common.renditions.get_rendition_executor"
+        ) as executor, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/admin/products/collection/add/",
+                {
+                    "title": "Summer",
+                    "slug": "summer",
+                    "description": "",
+                    "is_active": "on",
+                    "image": SimpleUploadedFile(
+                        "summer.jpg", create_jpeg(1000, 500), "image/jpeg"
+                    ),
+                },
+            )
+        self.assertEqual(response.status_code, 302)
+        executor.assert_not_called()
+        name = Collection.objects.get().image.name
+        self.assertEqual(self.get_width(name, "thumb", "avif"), 320)
+
+
+class UniqueSlugTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for slug in ("foo", "foo-2", "foo-10", "foo-bar", "foo-bar-3", "race"):
+            Collection.objects.create(title=slug, slug=slug)
+
+    def test_counters_continue_after_the_highest_taken(self):
+        with self.assertNumQueries(1):
+            slugs = get_unique_slugs(
+                Collection, ["foo", "foo-bar", "bar", "baz", "baz", "foo"]
+            )
+        self.assertEqual(
+            slugs, ["foo-11", "foo-bar-4", "bar", "baz", "baz-2", "foo-12"]
+        )
+
+    def test_own_slug_is_not_taken(self):
+        collection = Collection.objects.get(slug="foo-10")
+        self.assertEqual(
+            get_unique_slugs(Collection, ["foo-10"], collection.pk), ["foo-10"]
+        )
+
+    def test_unsaved_instances_get_slugs_in_one_query(self):
+        collections = [
+            Collection(title="Foo"),
+            Collection(title="Foo"),
+            Collection(title="Kept", slug="kept"),
+        ]
+        with self.assertNumQueries(1):
+            assign_unique_slugs(collections)
+        self.assertEqual(
+            [collection.slug for collection in collections],
+            ["foo-11", "foo-12", "kept"],
+        )
+
+    def test_slug_claimed_meanwhile_is_allocated_again(self):
+        # The first allocation is beaten to 'race' by a concurrent save.
+        with mock.patch(
+            "common.models.get_unique_slug", side_effect=["race", "race-2"]
+        ) as get_unique_slug:
+            collection = Collection.objects.create(title="Race")
+        self.assertEqual(collection.slug, "race-2")
+        self.assertEqual(get_unique_slug.call_count, 2)
+
+    def test_allocation_gives_up_after_max_attempts(self):
+        with mock.patch(
+            "common.models.get_unique_slug", return_value="race"
+        ) as get_unique_slug:
+            with self.assertRaises(IntegrityError):
+                Collection.objects.create(title="Race")
+        self.assertEqual(get_unique_slug.call_count, Collection.slug_max_attempts)
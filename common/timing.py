@@ -0,0 +1,66 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# The RequestTiming of the request being instrumented, if it was sampled.
+_current_timing = ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    """
+    Where the time of one request went. Installed by InstrumentationMiddleware
+    on sampled requests only; the helpers below do nothing otherwise.
+    Also a connection.execute_wrapper() that counts and times queries.
+    """
+
+    def __init__(self):
+        self.query_count = 0
+        self.query_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_time += time.perf_counter() - start
+            self.query_count += 1
+
+    @contextmanager
+    def activate(self):
+        token = _current_timing.set(self)
+        try:
+            yield self
+        finally:
+            _current_timing.reset(token)
+
+
+def record_cache_lookup(hit):
+    """Count a lookup of a cached payload (not of namespace versions)."""
+    timing = _current_timing.get()
+    if timing is None:
+        return
+    if hit:
+        timing.cache_hits += 1
+    else:
+        timing.cache_misses += 1
+
+
+@contextmanager
+def measure_serialization():
+    """Count the block as serializer time; nested blocks are counted once."""
+    timing = _current_timing.get()
+    if timing is None or timing.serializing:
+        yield
+        return
+
+    timing.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.serializer_time += time.perf_counter() - start
+        timing.serializing = False
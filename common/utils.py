@@ -1,11 +1,67 @@
-def get_unique_slug(model_class, base_slug, instance=None, counter=1):
+import re
+
+from django.db.models import Q
+from django.utils.text import slugify
+
+
+def get_unique_slug(model_class, base_slug, instance=None):
     """
-    Generate a unique slug, appending a counter if necessary.
+    Generate a unique slug, appending the next free counter if necessary.
     """
-    slug = base_slug if counter == 1 else f"{base_slug}-{counter}"
-    queryset = model_class.objects.filter(slug=slug)
-    if instance:
-        queryset = queryset.exclude(pk=instance.pk)
-    if not queryset.exists():
-        return slug
-    return get_unique_slug(model_class, base_slug, instance, counter + 1)
+    exclude_pk = instance.pk if instance else None
+    return get_unique_slugs(model_class, [base_slug], exclude_pk)[0]
+
+
+def get_unique_slugs(model_class, base_slugs, exclude_pk=None):
+    """
+    Generate a unique slug for each base slug with a single query.
+    - Existing '<base>' and '<base>-<n>' slugs are fetched at once
+    - A taken base continues after its highest taken counter
+    - Bases repeated in the list get consecutive counters
+    """
+    bases = set(base_slugs)
+    if not bases:
+        return []
+
+    lookup = Q()
+    for base in bases:
+        lookup |= Q(slug=base) | Q(slug__startswith=f"{base}-")
+    queryset = model_class.objects.filter(lookup)
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    taken = set(queryset.values_list("slug", flat=True))
+
+    # The highest counter in use per base; the bare base counts as 1.
+    counters = {}
+    for base in bases:
+        suffix = re.compile(rf"^{re.escape(base)}-(\d+)$")
+        counters[base] = max(
+            [1] + [int(m.group(1)) for m in map(suffix.match, taken) if m]
+        )
+
+    slugs = []
+    for base in base_slugs:
+        slug = base
+        while slug in taken:
+            counters[base] += 1
+            slug = f"{base}-{counters[base]}"
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def assign_unique_slugs(instances, populate_from="title"):
+    """
+    Fill in the empty 'slug' of every unsaved instance in one query, e.g.
+    before a bulk_create. All instances must be of the same model.
+    """
+    pending = [instance for instance in instances if not instance.slug]
+    if not pending:
+        return
+
+    slugs = get_unique_slugs(
+        type(pending[0]),
+        [slugify(getattr(instance, populate_from)) for instance in pending],
+    )
+    for instance, slug in zip(pending, slugs):
+        instance.slug = slug
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # Third party apps
     "corsheaders",
     "rest_framework",
@@ -68,6 +69,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "common.middleware.InstrumentationMiddleware",
 ]
 
 if DEBUG:
@@ -109,6 +111,104 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+REDIS_URL = config("DJANGO_REDIS_URL", default="")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Cached responses, their ETags and the other versioned entries of
+# common.cache need a cache every process shares: with a per-process one, a
+# namespace bumped in one worker leaves the others serving stale data. Off
+# without Redis.
+RESPONSE_CACHE_ENABLED = config(
+    "DJANGO_RESPONSE_CACHE_ENABLED", default=bool(REDIS_URL), cast=bool
+)
+
+# Seconds a cached catalog response may live; model signals invalidate it sooner.
+RESPONSE_CACHE_TIMEOUT = config(
+    "DJANGO_RESPONSE_CACHE_TIMEOUT", default=60 * 60, cast=int
+)
+
+# Share of requests (0 to 1) reported with Server-Timing headers and a log
+# line by InstrumentationMiddleware; 0 disables it.
+INSTRUMENTATION_SAMPLE_RATE = config(
+    "DJANGO_INSTRUMENTATION_SAMPLE_RATE", default=0.0, cast=float
+)
+
+# Seconds clients and CDNs may reuse a catalog response before revalidating
+# it with its ETag or Last-Modified.
+CATALOG_CACHE_MAX_AGE = config("DJANGO_CATALOG_CACHE_MAX_AGE", default=60, cast=int)
+
+# Serve collection product counts from the signal-maintained counter column
+# instead of a COUNT over the product join.
+COLLECTION_PRODUCT_COUNTER_ENABLED = config(
+    "DJANGO_COLLECTION_PRODUCT_COUNTER_ENABLED", default=True, cast=bool
+)
+
+# Build the product detail document in Postgres (products.details) instead of
+# running ProductDetailSerializer over prefetched instances.
+PRODUCT_DETAIL_SQL_ENABLED = config(
+    "DJANGO_PRODUCT_DETAIL_SQL_ENABLED", default=True, cast=bool
+)
+
+# Minutes stock stays reserved for a cart line without any cart activity.
+STOCK_RESERVATION_TTL_MINUTES = config(
+    "DJANGO_STOCK_RESERVATION_TTL_MINUTES", default=30, cast=int
+)
+
+# Threads per process generating image renditions after uploads.
+IMAGE_RENDITION_WORKERS = config("DJANGO_IMAGE_RENDITION_WORKERS", default=2, cast=int)
+
+# Sessions are read from the cache and written through to the database; see
+# the purge_abandoned_sessions command for their cleanup.
+SESSION_ENGINE = config(
+    "DJANGO_SESSION_ENGINE", default="django.contrib.sessions.backends.cached_db"
+)
+
+# An anonymous cart in the cache is the only copy of that cart, so it gets a
+# cache of its own, shared by every process, persistent and never evicting
+# (e.g. a Redis run with appendonly and maxmemory-policy noeviction). Without
+# one, anonymous carts are kept in the database like everybody else's.
+ANONYMOUS_CART_REDIS_URL = config("DJANGO_ANONYMOUS_CART_REDIS_URL", default="")
+ANONYMOUS_CART_CACHE = "carts"
+
+if ANONYMOUS_CART_REDIS_URL:
+    CACHES[ANONYMOUS_CART_CACHE] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": ANONYMOUS_CART_REDIS_URL,
+    }
+
+# Cart storage of logged-in users and promoted carts, and of anonymous
+# visitors until their cart is promoted at login or checkout.
+CART_STORAGE = "carts.storage.DatabaseCartStorage"
+ANONYMOUS_CART_STORAGE = config(
+    "DJANGO_ANONYMOUS_CART_STORAGE",
+    default=(
+        "carts.storage.CacheCartStorage"
+        if ANONYMOUS_CART_REDIS_URL
+        else "carts.storage.DatabaseCartStorage"
+    ),
+)
+ANONYMOUS_CART_COOKIE_NAME = "cart_token"
+# Seconds an anonymous cart lives after its last change.
+ANONYMOUS_CART_TTL = config(
+    "DJANGO_ANONYMOUS_CART_TTL", default=60 * 60 * 24 * 7, cast=int
+)
+
 AUTH_USER_MODEL = "accounts.User"
 
 # Password validation
@@ -192,6 +292,11 @@ LOGGING = {
             "level": "INFO",
             "propagate": True,
         },
+        "common.middleware": {
+            "handlers": ["console", "file"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
 
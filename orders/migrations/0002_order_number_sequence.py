@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:39
+
+from django.db import migrations, models
+
+import orders.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0001_initial"),
+    ]
+
+    operations = [
+        # MAXVALUE keeps the counter within the 9 zero-padded digits.
+        migrations.RunSQL(
+            f"CREATE SEQUENCE {orders.models.ORDER_NUMBER_SEQUENCE} MAXVALUE 999999999",
+            f"DROP SEQUENCE {orders.models.ORDER_NUMBER_SEQUENCE}",
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="order_number",
+            field=models.CharField(
+                db_default=orders.models.NextOrderNumber(),
+                editable=False,
+                max_length=20,
+                unique=True,
+            ),
+        ),
+    ]
@@ -1,9 +1,6 @@
-import secrets
-import string
 import uuid
 
 from django.db import models
-from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_countries.fields import CountryField
 
@@ -27,6 +24,25 @@ class OrderAddress(TimestampedModel):
         return f"{self.first_name} {self.last_name} - {self.city}"
 
 
+ORDER_NUMBER_SEQUENCE = "orders_order_number_seq"
+
+
+class NextOrderNumber(models.Func):
+    """
+    'ORD-YYMMDD-<9 digit counter>', computed by Postgres as the column default.
+    The counter is a sequence, so numbers never collide and are returned by
+    the INSERT itself; they also sort in creation order, which keeps inserts
+    into the unique index append-only.
+    """
+
+    template = (
+        "('ORD-' || to_char(now(), 'YYMMDD') || '-' || "
+        f"lpad(nextval('{ORDER_NUMBER_SEQUENCE}')::text, 9, '0'))"
+    )
+    output_field = models.CharField()
+    allowed_default = True
+
+
 class Order(TimestampedModel):
     class Status(models.TextChoices):
         PENDING = "PENDING", _("Pending")
@@ -38,7 +54,9 @@ class Order(TimestampedModel):
         REFUNDED = "REFUNDED", _("Refunded")
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    order_number = models.CharField(max_length=20, unique=True, editable=False)
+    order_number = models.CharField(
+        max_length=20, unique=True, editable=False, db_default=NextOrderNumber()
+    )
     email = models.EmailField(_("Customer Email"))
     status = models.CharField(
         max_length=20, choices=Status.choices, default=Status.PENDING, db_index=True
@@ -66,16 +84,6 @@ class Order(TimestampedModel):
     def __str__(self):
         return f"Order #{self.order_number} ({self.status})"
 
-    def save(self, *args, **kwargs):
-        if not self.order_number:
-            timestamp = timezone.now().strftime("%y%m%d")
-
-            alphabet = string.ascii_uppercase + string.digits
-            random_suffix = "".join(secrets.choice(alphabet) for _ in range(4))
-            self.order_number = f"ORD-{timestamp}-{random_suffix}"
-
-        super().save(*args, **kwargs)
-
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
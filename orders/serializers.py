@@ -1,6 +1,8 @@
 from django_countries.serializer_fields import CountryField
 from rest_framework import serializers
 
+from common.serializers import MeasuredSerializerMixin
+
 from .models import Order, OrderAddress, OrderItem
 
 
@@ -42,7 +44,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         ]
 
 
-class OrderReadSerializer(serializers.ModelSerializer):
+class OrderReadSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     shipping_address = OrderAddressSerializer(read_only=True)
     billing_address = OrderAddressSerializer(read_only=True)
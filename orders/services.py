@@ -1,51 +1,81 @@
+from decimal import Decimal
+
 from django.core.exceptions import ValidationError
 from django.db import transaction
+from django.utils import timezone
+
+from carts.models import Cart
+from carts.reservations import commit_reservations
 
 from .models import Order, OrderAddress, OrderItem
 
 
-def create_order_from_cart(user, cart, shipping_data, billing_data=None):
-    if cart.items.count() == 0:
-        raise ValidationError("Cannot create order from empty cart.")
+@transaction.atomic
+def create_order_from_cart(cart, shipping_data, billing_data=None):
+    """
+    Turn the cart into a pending order. The cart lines, their variants and
+    the SQL-computed line totals are read once and every write is a single
+    statement, so checkout costs the same number of queries however many
+    lines the cart has.
 
-    with transaction.atomic():
-        shipping_address = OrderAddress.objects.create(**shipping_data)
-
-        if billing_data:
-            billing_address = OrderAddress.objects.create(**billing_data)
-        else:
-            billing_address = OrderAddress.objects.create(**shipping_data)
-
-        order = Order.objects.create(
-            user=user if user.is_authenticated else None,
-            email=shipping_data["email"],
-            shipping_address=shipping_address,
-            billing_address=billing_address,
-            total_amount=cart.total_price,
-            status=Order.Status.PENDING,
-        )
+    The cart is claimed first, by moving it from active to completed: the row
+    lock serializes concurrent checkouts of one cart, and only the first gets
+    to create an order.
+    """
+    claimed = Cart.objects.filter(pk=cart.pk, status=Cart.Status.ACTIVE).update(
+        status=Cart.Status.COMPLETED, updated_at=timezone.now()
+    )
+    if not claimed:
+        raise ValidationError("This cart has already been checked out.")
 
-        order_items = []
-        for cart_item in cart.items.select_related(
-            "product_variant", "product_variant__product"
-        ):
-            variant = cart_item.product_variant
+    cart_items = list(
+        cart.items.with_line_totals()
+        .select_related("product_variant__product")
+        .order_by("pk")
+    )
+    if not cart_items:
+        raise ValidationError("Cannot create order from empty cart.")
 
-            item = OrderItem(
-                order=order,
+    total_amount = Decimal("0.00")
+    quantities = {}
+    order_items = []
+    for cart_item in cart_items:
+        variant = cart_item.product_variant
+        total_amount += cart_item.line_total
+        quantities[variant.pk] = quantities.get(variant.pk, 0) + cart_item.quantity
+
+        order_items.append(
+            OrderItem(
                 product_variant=variant,
                 product_sku=variant.sku,
                 product_name=variant.product.title,
                 attributes=variant.attributes,
                 unit_price=variant.price,
                 quantity=cart_item.quantity,
-                total_price=cart_item.total_price,
+                total_price=cart_item.line_total,
             )
-            order_items.append(item)
+        )
+
+    shipping_address, billing_address = OrderAddress.objects.bulk_create(
+        [
+            OrderAddress(**shipping_data),
+            OrderAddress(**(billing_data or shipping_data)),
+        ]
+    )
+
+    order = Order.objects.create(
+        email=shipping_data["email"],
+        shipping_address=shipping_address,
+        billing_address=billing_address,
+        total_amount=total_amount,
+        status=Order.Status.PENDING,
+    )
 
-        OrderItem.objects.bulk_create(order_items)
+    for item in order_items:
+        item.order = order
+    OrderItem.objects.bulk_create(order_items)
 
-        cart.status = "COMPLETED"
-        cart.save()
+    commit_reservations(cart, quantities)
+    cart.status = Cart.Status.COMPLETED
 
-        return order
+    return order
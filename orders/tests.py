@@ -1 +1,142 @@
-# Create your tests here.
+import multiprocessing
+import os
+import threading
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase
+
+from carts.models import Cart, CartItem
+from carts.reservations import reserve_stock
+from carts.tests import create_variants
+from orders.models import NextOrderNumber, Order
+from orders.services import create_order_from_cart
+
+SHIPPING_DATA = {
+    "first_name": "Ada",
+    "last_name": "Lovelace",
+    "email": "ada@example.com",
+    "address_line_1": "1 Marble Street",
+    "city": "London",
+    "state": "London",
+    "postal_code": "N1",
+    "country": "GB",
+}
+
+
+def create_cart(variants, quantity=1):
+    """An active cart holding 'quantity' of every variant, reserved."""
+    cart = Cart.objects.create(session_key="session")
+    CartItem.objects.bulk_create(
+        [
+            CartItem(cart=cart, product_variant=variant, quantity=quantity)
+            for variant in variants
+        ]
+    )
+    reserve_stock(cart, {variant.pk: quantity for variant in variants})
+    return cart
+
+
+class CheckoutQueryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def checkout(self, line_count):
+        cart = create_cart(create_variants(*[5] * line_count))
+        # Claim the cart, read its lines, write the addresses, the order and
+        # its items, then settle the reservations; plus two savepoints.
+        with self.assertNumQueries(11):
+            order = create_order_from_cart(cart, dict(SHIPPING_DATA))
+        self.assertEqual(order.items.count(), line_count)
+
+    def test_single_line_cart(self):
+        self.checkout(1)
+
+    def test_many_line_cart(self):
+        self.checkout(8)
+
+    def test_completed_cart_is_refused(self):
+        cart = create_cart(create_variants(5))
+        create_order_from_cart(cart, dict(SHIPPING_DATA))
+        with self.assertRaises(ValidationError):
+            create_order_from_cart(cart, dict(SHIPPING_DATA))
+        self.assertEqual(Order.objects.count(), 1)
+
+
+# Commits run for real here; the placeholder images have no renditions to make.
+@mock.patch("common.renditions.generate_renditions_on_commit")
+class ConcurrentCheckoutTests(TransactionTestCase):
+    workers = 6
+
+    def setUp(self):
+        cache.clear()
+
+    def test_one_cart_makes_one_order(self, generate_renditions_on_commit):
+        cart = create_cart(create_variants(5, 5))
+        barrier = threading.Barrier(self.workers)
+        results = []
+
+        def checkout():
+            try:
+                barrier.wait()
+                create_order_from_cart(
+                    Cart.objects.get(pk=cart.pk), dict(SHIPPING_DATA)
+                )
+                results.append(True)
+            except ValidationError:
+                results.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(Order.objects.count(), 1)
+
+
+def draw_order_numbers(count, batch_size=10_000):
+    """Take 'count' order numbers in this process, as INSERTs would."""
+    numbers = []
+    with connection.cursor() as cursor:
+        while len(numbers) < count:
+            cursor.execute(
+                f"SELECT {NextOrderNumber.template} FROM generate_series(1, %s)",
+                [min(batch_size, count - len(numbers))],
+            )
+            numbers.extend(number for (number,) in cursor.fetchall())
+    connection.close()
+    return numbers
+
+
+@skipUnless(
+    "fork" in multiprocessing.get_all_start_methods(), "needs fork() to share settings"
+)
+class OrderNumberStressTests(TransactionTestCase):
+    """
+    Order numbers drawn by several processes at once. Set
+    ORDER_NUMBER_STRESS_TOTAL=1000000 to run at full volume.
+    """
+
+    processes = 8
+    total = int(os.environ.get("ORDER_NUMBER_STRESS_TOTAL", 40_000))
+
+    def test_numbers_are_unique_and_monotonic(self):
+        # Children must open their own connections to the test database.
+        connections.close_all()
+        with multiprocessing.get_context("fork").Pool(self.processes) as pool:
+            results = pool.map(
+                draw_order_numbers, [self.total // self.processes] * self.processes
+            )
+
+        numbers = [number for numbers in results for number in numbers]
+        self.assertEqual(len(numbers), self.total)
+        self.assertEqual(len(set(numbers)), self.total)
+        for numbers in results:
+            counters = [int(number.rsplit("-", 1)[1]) for number in numbers]
+            self.assertEqual(counters, sorted(counters))
@@ -3,8 +3,9 @@ from rest_framework import status, views
 from rest_framework.response import Response
 
 from carts.models import Cart
+from carts.storage import promote_anonymous_cart
 
-from .serializers import OrderCreateSerializer
+from .serializers import OrderCreateSerializer, OrderReadSerializer
 from .services import create_order_from_cart
 
 
@@ -19,8 +20,16 @@ class CheckoutView(views.APIView):
         return None
 
     def post(self, request):
+        # An anonymous cart only reaches the database, with its stock
+        # reserved, at checkout.
+        errors = promote_anonymous_cart(request)
+        if errors:
+            return Response(
+                {"error": errors[0]["error"]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
         cart = self.get_cart(request)
-        if not cart or cart.items.count() == 0:
+        if not cart:
             return Response(
                 {"error": "Cart is empty or not found."},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -37,15 +46,18 @@ class CheckoutView(views.APIView):
 
         try:
             order = create_order_from_cart(
-                user=request.user,
                 cart=cart,
                 shipping_data=shipping_data,
                 billing_data=billing_data,
             )
         except ValidationError as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(
+                {"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {"error": "Unable to create order. Please try again."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+
+        return Response(OrderReadSerializer(order).data, status=status.HTTP_201_CREATED)
@@ -6,6 +6,7 @@ from django.forms import Textarea
 from django.utils.html import mark_safe
 from mptt.admin import MPTTModelAdmin
 
+from common.admin import RenditionsAdminMixin
 from products.models import *
 
 
@@ -112,8 +113,14 @@ class ProductTypeAdmin(admin.ModelAdmin):
 
 
 @admin.register(Collection)
-class CollectionAdmin(AdminImagePreviewMixin, admin.ModelAdmin):
-    list_display = ["title", "slug", "is_active", "preview_image"]
+class CollectionAdmin(RenditionsAdminMixin, AdminImagePreviewMixin, admin.ModelAdmin):
+    list_display = [
+        "title",
+        "slug",
+        "is_active",
+        "published_product_count",
+        "preview_image",
+    ]
     list_filter = ["is_active", "created_at"]
     search_fields = ["title"]
     prepopulated_fields = {"slug": ("title",)}
@@ -122,7 +129,7 @@ class CollectionAdmin(AdminImagePreviewMixin, admin.ModelAdmin):
 
 
 @admin.register(Product)
-class ProductAdmin(AdminImagePreviewMixin, admin.ModelAdmin):
+class ProductAdmin(RenditionsAdminMixin, AdminImagePreviewMixin, admin.ModelAdmin):
     list_display = [
         "title",
         "product_type",
@@ -186,7 +193,9 @@ class ProductAdmin(AdminImagePreviewMixin, admin.ModelAdmin):
 
 
 @admin.register(ProductVariant)
-class ProductVariantAdmin(AdminImagePreviewMixin, admin.ModelAdmin):
+class ProductVariantAdmin(
+    RenditionsAdminMixin, AdminImagePreviewMixin, admin.ModelAdmin
+):
     list_display = ["product", "sku", "price", "stock_quantity", "preview_image"]
     list_filter = ["product__product_type", "created_at"]
     search_fields = ["sku", "product__title"]
@@ -209,7 +218,9 @@ class ProductVariantAdmin(AdminImagePreviewMixin, admin.ModelAdmin):
 
 
 @admin.register(ProductGalleryImage)
-class ProductGalleryImageAdmin(AdminImagePreviewMixin, admin.ModelAdmin):
+class ProductGalleryImageAdmin(
+    RenditionsAdminMixin, AdminImagePreviewMixin, admin.ModelAdmin
+):
     list_display = ["product", "variant", "is_feature", "preview_image"]
     list_filter = ["is_feature"]
     autocomplete_fields = ["product", "variant"]
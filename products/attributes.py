@@ -0,0 +1,73 @@
+from django.conf import settings
+
+from common.cache import get_or_set_versioned
+from products.models import Attribute
+
+
+def get_attribute_schema(product_type_id):
+    """
+    {attribute slug: choices} of the attributes a product type allows.
+    Cached under the 'attributes' namespace, which is bumped whenever an
+    attribute or a product type's allowed attributes change.
+    """
+    return get_or_set_versioned(
+        f"attribute-schema:{product_type_id}",
+        ["attributes"],
+        lambda: dict(
+            Attribute.objects.filter(product_types=product_type_id).values_list(
+                "slug", "choices"
+            )
+        ),
+        settings.RESPONSE_CACHE_TIMEOUT,
+    )
+
+
+def get_attribute_errors(schema, attributes):
+    """Messages for every way 'attributes' breaks the schema, in memory."""
+    errors = []
+
+    # 1. Forbidden attributes (security)
+    invalid_keys = set(attributes) - set(schema)
+    if invalid_keys:
+        errors.append(
+            f"Attributes {invalid_keys} are not allowed for this product type."
+        )
+
+    # 2. Missing required attributes (integrity)
+    missing_keys = set(schema) - set(attributes)
+    if missing_keys:
+        errors.append(f"Missing required attributes: {missing_keys}")
+
+    # 3. Values against choices (business logic)
+    for key, value in attributes.items():
+        valid_choices = schema.get(key)
+        if valid_choices and value not in valid_choices:
+            errors.append(
+                f"Value '{value}' is not valid for '{key}'. Allowed: {valid_choices}"
+            )
+
+    return errors
+
+
+def validate_variants_bulk(variants, product_type=None):
+    """
+    Check the attributes of many variants against their product type's
+    schema. Each distinct product type costs one cache lookup and nothing
+    per variant. Pass 'product_type' to check variants whose product isn't
+    built yet. Returns a list of error messages per variant, in input order;
+    valid variants get an empty list.
+    """
+    schemas = {}
+    results = []
+    for variant in variants:
+        if product_type is not None:
+            product_type_id = product_type.pk
+        else:
+            product_type_id = variant.product.product_type_id
+
+        if product_type_id not in schemas:
+            schemas[product_type_id] = get_attribute_schema(product_type_id)
+        results.append(
+            get_attribute_errors(schemas[product_type_id], variant.attributes)
+        )
+    return results
@@ -0,0 +1,28 @@
+from django.conf import settings
+from mptt.utils import get_cached_trees
+
+from common.cache import get_or_set_versioned
+from products.models import Category
+from products.serializers import CategoryTreeSerializer
+
+
+def build_category_tree(request):
+    """
+    Serialize the whole category tree from one query. get_cached_trees() wires
+    up every node's children in memory, so get_children() never hits the db.
+    """
+    roots = get_cached_trees(Category.objects.order_by("tree_id", "lft"))
+    return CategoryTreeSerializer(roots, many=True, context={"request": request}).data
+
+
+def get_category_tree(request):
+    """
+    The nested category payload, cached until any category is saved, moved or
+    deleted. Keyed per host, as image URLs are absolute.
+    """
+    return get_or_set_versioned(
+        f"category-tree:{request.build_absolute_uri('/')}",
+        ["categories"],
+        lambda: build_category_tree(request),
+        settings.RESPONSE_CACHE_TIMEOUT,
+    )
@@ -0,0 +1,146 @@
+import json
+
+from django.db import connection
+
+from common.renditions import get_rendition_urls
+from common.serializers import get_image_url
+from common.timing import measure_serialization
+from products.models import Category, Product, ProductGalleryImage, ProductVariant
+
+# The ProductDetailSerializer document, built by Postgres. json (not jsonb)
+# objects keep their keys in the order given, which is the serializer's field
+# order; related rows follow the orderings of the view's prefetches. Image
+# fields hold file names and the renditions null until add_image_urls runs.
+PRODUCT_DETAIL_SQL = """
+SELECT json_build_object(
+    'id', p.id,
+    'title', p.title,
+    'slug', p.slug,
+    'status', p.status,
+    'description', p.description,
+    'base_price', p.base_price::text,
+    'thumbnail', p.thumbnail,
+    'thumbnail_renditions', NULL,
+    'specifications', p.specifications,
+    'product_type', (
+        SELECT json_build_object(
+            'id', t.id,
+            'name', t.name,
+            'allowed_attributes', (
+                SELECT COALESCE(
+                    json_agg(
+                        json_build_object(
+                            'id', a.id,
+                            'name', a.name,
+                            'slug', a.slug,
+                            'choices', a.choices
+                        )
+                        ORDER BY a.id
+                    ),
+                    '[]'::json
+                )
+                FROM products_attribute a
+                JOIN products_producttype_allowed_attributes ta
+                    ON ta.attribute_id = a.id
+                WHERE ta.producttype_id = t.id
+            )
+        )
+        FROM products_producttype t
+        WHERE t.id = p.product_type_id
+    ),
+    'categories', (
+        SELECT COALESCE(
+            json_agg(
+                json_build_object(
+                    'id', c.id,
+                    'title', c.title,
+                    'slug', c.slug,
+                    'description', c.description,
+                    'image', c.image,
+                    'image_renditions', NULL,
+                    'parent', c.parent_id
+                )
+                ORDER BY c.tree_id, c.lft
+            ),
+            '[]'::json
+        )
+        FROM products_category c
+        JOIN products_product_categories pc ON pc.category_id = c.id
+        WHERE pc.product_id = p.id
+    ),
+    'variants', (
+        SELECT COALESCE(
+            json_agg(
+                json_build_object(
+                    'id', v.id,
+                    'sku', v.sku,
+                    'price', v.price::text,
+                    'compare_at_price', v.compare_at_price::text,
+                    'stock_quantity', v.stock_quantity,
+                    'is_in_stock', v.stock_quantity > 0,
+                    'image', v.image,
+                    'image_renditions', NULL,
+                    'attributes', v.attributes
+                )
+                ORDER BY v.sku
+            ),
+            '[]'::json
+        )
+        FROM products_productvariant v
+        WHERE v.product_id = p.id
+    ),
+    'gallery_images', (
+        SELECT COALESCE(
+            json_agg(
+                json_build_object(
+                    'id', g.id,
+                    'image', g.image,
+                    'image_renditions', NULL,
+                    'alt_text', g.alt_text,
+                    'is_feature', g.is_feature,
+                    'variant', g.variant_id
+                )
+                ORDER BY g.id
+            ),
+            '[]'::json
+        )
+        FROM products_productgalleryimage g
+        WHERE g.product_id = p.id
+    )
+)::text
+FROM products_product p
+WHERE p.id IN ({products_sql})
+"""
+
+
+def add_image_urls(document, model, field_name, request=None):
+    """Turn the file name under 'field_name' into its URL and renditions."""
+    field = model._meta.get_field(field_name)
+    field_file = field.attr_class(None, field, document[field_name])
+    document[field_name] = get_image_url(field_file, request)
+    document[f"{field_name}_renditions"] = get_rendition_urls(field_file, request)
+
+
+def get_product_detail_document(products, request=None):
+    """
+    The ProductDetailSerializer representation of the first product of the
+    'products' queryset, built in a single query; None if it's empty.
+    """
+    products_sql, params = products.order_by().values("pk")[:1].query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(PRODUCT_DETAIL_SQL.format(products_sql=products_sql), params)
+        row = cursor.fetchone()
+
+    if row is None:
+        return None
+
+    with measure_serialization():
+        document = json.loads(row[0])
+        add_image_urls(document, Product, "thumbnail", request)
+        for category in document["categories"]:
+            add_image_urls(category, Category, "image", request)
+        for variant in document["variants"]:
+            add_image_urls(variant, ProductVariant, "image", request)
+        for gallery_image in document["gallery_images"]:
+            add_image_urls(gallery_image, ProductGalleryImage, "image", request)
+    return document
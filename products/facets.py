@@ -0,0 +1,162 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, ExpressionWrapper, Q
+
+from common.cache import get_or_set_versioned
+from products.models import Attribute, ProductVariant
+
+ATTRIBUTE_PARAM_PREFIX = "attr_"
+
+# Query params that change the page, not the result set, and so never the facets.
+NON_FILTER_PARAMS = {"cursor", "page", "ordering", "format"}
+
+
+def get_facet_attributes():
+    """Attributes allowed on at least one product type, as plain dicts."""
+    return get_or_set_versioned(
+        "facet-attributes",
+        ["attributes"],
+        lambda: list(
+            Attribute.objects.filter(product_types__isnull=False)
+            .distinct()
+            .order_by("name")
+            .values("slug", "name", "choices")
+        ),
+        settings.RESPONSE_CACHE_TIMEOUT,
+    )
+
+
+def parse_attribute_filters(query_params):
+    """
+    Collect '?attr_<slug>=<value>' params for known attributes.
+    Repeating a param ORs its values: '?attr_material=bronze&attr_material=marble'.
+    """
+    attribute_values = {}
+    for attribute in get_facet_attributes():
+        values = query_params.getlist(f"{ATTRIBUTE_PARAM_PREFIX}{attribute['slug']}")
+        values = [value for value in values if value]
+        if values:
+            attribute_values[attribute["slug"]] = values
+    return attribute_values
+
+
+def get_variant_filter(attribute_values, min_price=None, max_price=None):
+    """
+    Conditions a single variant has to meet for its product to match.
+    Attribute checks use JSON containment, which the variant_attributes_gin
+    index answers.
+    """
+    variant_filter = Q()
+    for slug, values in attribute_values.items():
+        any_value = Q()
+        for value in values:
+            any_value |= Q(attributes__contains={slug: value})
+        variant_filter &= any_value
+
+    if min_price is not None:
+        variant_filter &= Q(price__gte=min_price)
+    if max_price is not None:
+        variant_filter &= Q(price__lte=max_price)
+
+    return variant_filter
+
+
+def get_facet_cache_key(query_params):
+    state = sorted(
+        (key, value)
+        for key, values in query_params.lists()
+        if key not in NON_FILTER_PARAMS
+        for value in values
+    )
+    return f"product-facets:{hashlib.md5(urlencode(state).encode()).hexdigest()}"
+
+
+def get_facet_counts(products, attribute_values, min_price=None, max_price=None):
+    """
+    Count matching products per attribute value in one aggregate query.
+
+    'products' carries the product-level filters only. Counts are
+    disjunctive: each attribute is counted with every variant condition but
+    its own selection, so a value shows how many products adding it (ORed,
+    like a repeated param) would match.
+
+    Every allowed attribute is returned. Attributes with choices list each
+    choice in order, including zero counts; free-form attributes list the
+    values found.
+    """
+    attributes = get_facet_attributes()
+    if not attributes:
+        return []
+
+    # One boolean column per selected attribute; the outer query waives the
+    # column of the attribute being counted.
+    selected = list(attribute_values.items())
+    matches = {
+        f"matches_{index}": ExpressionWrapper(
+            get_variant_filter({slug: values}), output_field=BooleanField()
+        )
+        for index, (slug, values) in enumerate(selected)
+    }
+    variants = (
+        ProductVariant.objects.filter(
+            get_variant_filter({}, min_price=min_price, max_price=max_price),
+            product__in=products.order_by().values("pk"),
+        )
+        .annotate(**matches)
+        .order_by()
+        .values("product_id", "attributes", *matches)
+    )
+    variants_sql, params = variants.query.sql_with_params()
+    conditions = "".join(f" AND (kv.key = %s OR v.{name})" for name in matches)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT kv.key, kv.value, COUNT(DISTINCT v.product_id)
+            FROM ({variants_sql}) AS v
+            CROSS JOIN LATERAL jsonb_each_text(v.attributes) AS kv
+            WHERE kv.key = ANY(%s){conditions}
+            GROUP BY kv.key, kv.value
+            """,
+            [
+                *params,
+                [attribute["slug"] for attribute in attributes],
+                *(slug for slug, _ in selected),
+            ],
+        )
+        counts = {(key, value): count for key, value, count in cursor.fetchall()}
+
+    facets = []
+    for attribute in attributes:
+        if attribute["choices"]:
+            values = [str(choice) for choice in attribute["choices"]]
+        else:
+            values = sorted(value for key, value in counts if key == attribute["slug"])
+
+        facets.append(
+            {
+                "slug": attribute["slug"],
+                "name": attribute["name"],
+                "param": f"{ATTRIBUTE_PARAM_PREFIX}{attribute['slug']}",
+                "values": [
+                    {"value": value, "count": counts.get((attribute["slug"], value), 0)}
+                    for value in values
+                ],
+            }
+        )
+    return facets
+
+
+def get_cached_facet_counts(
+    query_params, products, attribute_values, min_price=None, max_price=None
+):
+    """Facet counts, cached per filter state until the catalog changes."""
+    return get_or_set_versioned(
+        get_facet_cache_key(query_params),
+        ["products", "attributes"],
+        lambda: get_facet_counts(products, attribute_values, min_price, max_price),
+        settings.RESPONSE_CACHE_TIMEOUT,
+    )
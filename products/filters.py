@@ -0,0 +1,97 @@
+import django_filters
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import Exists, F, OuterRef, Q
+from rest_framework import filters
+
+from products.facets import get_variant_filter, parse_attribute_filters
+from products.models import SEARCH_CONFIG, Product, ProductVariant
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    Ranked full-text search over Product.search_vector.
+    - Matches use the GIN-indexed vector (websearch syntax: "bronze -bust")
+    - Titles within trigram distance also match, so typos still find results
+    - Results are ordered by rank unless an explicit ordering is requested
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+
+        text = " ".join(search_terms)
+        query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+
+        return (
+            queryset.filter(Q(search_vector=query) | Q(title__trigram_similar=text))
+            .annotate(
+                search_rank=SearchRank(F("search_vector"), query)
+                + TrigramSimilarity("title", text)
+            )
+            .order_by("-search_rank", "-created_at")
+        )
+
+
+class ProductFilter(django_filters.FilterSet):
+    """
+    Catalog filters answered from the ProductListing row, so the list query
+    never joins the category/collection M2M tables.
+
+    Variant-level filters ('?attr_<slug>=', '?min_price=', '?max_price=') are
+    combined into a single EXISTS over ProductVariant, so one variant has to
+    satisfy all of them.
+    """
+
+    categories__slug = django_filters.CharFilter(method="filter_category")
+    collections__slug = django_filters.CharFilter(method="filter_collection")
+    in_stock = django_filters.BooleanFilter(method="filter_in_stock")
+    min_price = django_filters.NumberFilter(method="filter_variant_price")
+    max_price = django_filters.NumberFilter(method="filter_variant_price")
+
+    class Meta:
+        model = Product
+        fields = []
+
+    def filter_queryset(self, queryset):
+        queryset = self.filter_products(queryset)
+
+        variant_filter = self.get_variant_filter()
+        if variant_filter:
+            queryset = queryset.filter(
+                Exists(
+                    ProductVariant.objects.filter(
+                        variant_filter, product=OuterRef("pk")
+                    )
+                )
+            )
+        return queryset
+
+    def filter_products(self, queryset):
+        """The product-level filters only, without the variant EXISTS."""
+        return super().filter_queryset(queryset)
+
+    def get_attribute_values(self):
+        return parse_attribute_filters(self.data)
+
+    def get_variant_filter(self):
+        return get_variant_filter(
+            self.get_attribute_values(),
+            min_price=self.form.cleaned_data.get("min_price"),
+            max_price=self.form.cleaned_data.get("max_price"),
+        )
+
+    def filter_variant_price(self, queryset, name, value):  # noqa
+        # Applied together with the attribute filters in filter_queryset().
+        return queryset
+
+    def filter_category(self, queryset, name, value):  # noqa
+        return queryset.filter(listing__category_slugs__contains=[value])
+
+    def filter_collection(self, queryset, name, value):  # noqa
+        return queryset.filter(listing__collection_slugs__contains=[value])
+
+    def filter_in_stock(self, queryset, name, value):  # noqa
+        if value:
+            return queryset.filter(listing__total_stock__gt=0)
+        return queryset.exclude(listing__total_stock__gt=0)
@@ -0,0 +1,86 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+
+from products.models import Collection, Product, ProductListing, ProductVariant
+
+LISTING_UPDATE_FIELDS = [
+    "min_price",
+    "max_price",
+    "total_stock",
+    "variant_count",
+    "category_slugs",
+    "category_names",
+    "collection_slugs",
+]
+
+
+def refresh_product_listings(product_ids):
+    """
+    Rebuild the ProductListing rows of the given products.
+    Costs a fixed number of queries however many products are passed.
+    """
+    product_ids = set(
+        Product.objects.filter(pk__in=product_ids).values_list("pk", flat=True)
+    )
+    if not product_ids:
+        return
+
+    variant_stats = {
+        row["product_id"]: row
+        for row in ProductVariant.objects.filter(product_id__in=product_ids)
+        .values("product_id")
+        .annotate(
+            min_price=Min("price"),
+            max_price=Max("price"),
+            total_stock=Sum("stock_quantity"),
+            variant_count=Count("id"),
+        )
+        .order_by()
+    }
+
+    categories = defaultdict(list)
+    for product_id, slug, title in (
+        Product.categories.through.objects.filter(product_id__in=product_ids)
+        .order_by("category__title")
+        .values_list("product_id", "category__slug", "category__title")
+    ):
+        categories[product_id].append((slug, title))
+
+    collections = defaultdict(list)
+    for product_id, slug in (
+        Collection.products.through.objects.filter(product_id__in=product_ids)
+        .order_by("collection__slug")
+        .values_list("product_id", "collection__slug")
+    ):
+        collections[product_id].append(slug)
+
+    listings = []
+    for product_id in product_ids:
+        stats = variant_stats.get(product_id, {})
+        listings.append(
+            ProductListing(
+                product_id=product_id,
+                min_price=stats.get("min_price"),
+                max_price=stats.get("max_price"),
+                total_stock=stats.get("total_stock") or 0,
+                variant_count=stats.get("variant_count") or 0,
+                category_slugs=[slug for slug, _ in categories[product_id]],
+                category_names=[title for _, title in categories[product_id]],
+                collection_slugs=collections[product_id],
+            )
+        )
+
+    ProductListing.objects.bulk_create(
+        listings,
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=LISTING_UPDATE_FIELDS,
+    )
+
+
+def refresh_listings_on_commit(product_ids):
+    product_ids = list(product_ids)
+    if product_ids:
+        transaction.on_commit(lambda: refresh_product_listings(product_ids))
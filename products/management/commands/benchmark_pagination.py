@@ -0,0 +1,93 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+
+from products.pagination import KeysetCursor, KeysetCursorPagination
+from products.views import ProductViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Time shallow and deep product list pages with page-number and keyset "
+        "pagination against the current database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pages",
+            type=int,
+            nargs="+",
+            default=[1, 10, 100, 1000],
+            help="Page numbers to fetch",
+        )
+        parser.add_argument(
+            "--ordering",
+            default="-created_at",
+            help="One of the ProductViewSet ordering_fields, optionally prefixed by '-'",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Fetches per measurement"
+        )
+
+    def handle(self, *args, **options):
+        view = ProductViewSet()
+        queryset = ProductViewSet.queryset.all()
+        factory = RequestFactory(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        ordering = options["ordering"]
+        field = ordering.lstrip("-")
+        prefix = "-" if ordering.startswith("-") else ""
+        page_size = PageNumberPagination.page_size
+
+        self.stdout.write(f"{'page':>8} {'page-number ms':>16} {'keyset ms':>12}")
+        for page in options["pages"]:
+            boundary = (
+                queryset.order_by(f"{prefix}{field}", f"{prefix}id").values(
+                    field, "id"
+                )[(page - 1) * page_size - 1 : (page - 1) * page_size]
+                if page > 1
+                else []
+            )
+            if page > 1 and not boundary:
+                self.stdout.write(f"{page:>8} {'(no such page)':>16}")
+                continue
+
+            page_request = Request(
+                factory.get("/", {"page": page, "ordering": ordering})
+            )
+            keyset_params = {"ordering": ordering}
+            if boundary:
+                keyset = KeysetCursorPagination()
+                keyset.field = field
+                keyset.descending = bool(prefix)
+                row = boundary[0]
+                keyset_params["cursor"] = keyset.encode_position(
+                    KeysetCursor(row[field], row["id"], reverse=False)
+                )
+            keyset_request = Request(factory.get("/", keyset_params))
+
+            page_ms = self.measure(
+                lambda: PageNumberPagination().paginate_queryset(
+                    queryset.order_by(f"{prefix}{field}", f"{prefix}id"),
+                    page_request,
+                    view,
+                ),
+                options["repeat"],
+            )
+            keyset_ms = self.measure(
+                lambda: KeysetCursorPagination().paginate_queryset(
+                    queryset, keyset_request, view
+                ),
+                options["repeat"],
+            )
+            self.stdout.write(f"{page:>8} {page_ms:>16.2f} {keyset_ms:>12.2f}")
+
+    def measure(self, fetch, repeat):
+        fetch()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            list(fetch())
+        return (time.perf_counter() - start) * 1000 / repeat
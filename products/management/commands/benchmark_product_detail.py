@@ -0,0 +1,71 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from products.details import get_product_detail_document
+from products.serializers import ProductDetailSerializer
+from products.views import ProductViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the product detail document built by ProductDetailSerializer "
+        "against the one built in SQL (their parity is tested in products.tests)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--products",
+            type=int,
+            default=50,
+            help="Number of published products to time",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Builds per measurement"
+        )
+
+    def handle(self, *args, **options):
+        view = ProductViewSet()
+        view.action = "retrieve"
+        queryset = view.get_queryset()
+        request = RequestFactory(HTTP_HOST=settings.ALLOWED_HOSTS[0]).get("/")
+
+        def build_with_serializer(slug):
+            return ProductDetailSerializer(
+                queryset.get(slug=slug), context={"request": request}
+            ).data
+
+        def build_with_sql(slug):
+            return get_product_detail_document(queryset.filter(slug=slug), request)
+
+        slugs = list(
+            queryset.order_by("-created_at").values_list("slug", flat=True)[
+                : options["products"]
+            ]
+        )
+        if not slugs:
+            self.stdout.write(self.style.WARNING("No published products to time"))
+            return
+
+        self.stdout.write(f"{'engine':>12} {'queries':>8} {'ms/product':>12}")
+        for name, build in (
+            ("serializer", build_with_serializer),
+            ("sql", build_with_sql),
+        ):
+            queries, ms = self.measure(build, slugs, options["repeat"])
+            self.stdout.write(f"{name:>12} {queries:>8} {ms:>12.2f}")
+
+    def measure(self, build, slugs, repeat):
+        """Queries per product and mean milliseconds per product."""
+        with CaptureQueriesContext(connection) as ctx:
+            build(slugs[0])
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for slug in slugs:
+                build(slug)
+        ms = (time.perf_counter() - start) * 1000 / (repeat * len(slugs))
+        return len(ctx.captured_queries), ms
@@ -1,23 +1,131 @@
+import hashlib
 import json
 import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from itertools import islice
 
+import ijson
 from django.core.files import File
+from django.core.files.storage import default_storage
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 
+from carts.models import StockReservation
+from common.cache import invalidate_on_commit
+from common.renditions import generate_renditions_on_commit
+from common.utils import assign_unique_slugs
+from products.attributes import validate_variants_bulk
+from products.listings import refresh_product_listings
 from products.models import (
     Product,
+    ProductType,
     ProductVariant,
+    product_search_vector,
 )
 
 logger = logging.getLogger(__name__)
 
+CHECKPOINT_FILENAME = ".import_products.checkpoint"
+
+IMPORT_UPLOAD_DIR = "products/imports"
+
+EXISTING_VARIANT_FIELDS = [
+    "sku",
+    "product_id",
+    "price",
+    "stock_quantity",
+    "attributes",
+    "image",
+]
+
+VARIANT_UPSERT_FIELDS = ["price", "stock_quantity", "attributes", "image", "updated_at"]
+
+# Feed fields copied into Product.specifications.
+SPECIFICATION_FIELDS = ["height_cm", "width_cm", "depth_cm", "product_page_url"]
+
+
+def reserved_quantity():
+    """Units of the variant held by cart reservations, already off its stock."""
+    return Coalesce(
+        Subquery(
+            StockReservation.objects.filter(product_variant=OuterRef("pk"))
+            .values("product_variant")
+            .annotate(total=Sum("quantity"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def get_available_stock(on_hand, reserved):
+    return max(on_hand - reserved, 0)
+
+
+def get_image_name(digest, extension):
+    return f"{IMPORT_UPLOAD_DIR}/{digest[:2]}/{digest}{extension}"
+
+
+def is_stored_image(name, digest):
+    """Whether the stored image 'name' was imported from a file with this digest."""
+    return os.path.basename(name).startswith(digest)
+
 
 class Command(BaseCommand):
-    help = "Import products from JSON file and create Product and ProductVariant models"
+    help = (
+        "Stream products from products-to-import.json and bulk create Product "
+        "and ProductVariant rows in resumable batches"
+    )
 
     def add_arguments(self, parser):
         parser.add_argument("base_path", type=str, help="Base path for JSON and assets")
+        parser.add_argument(
+            "--product-type",
+            required=True,
+            help="Name of the ProductType the imported products get",
+        )
+        parser.add_argument(
+            "--status",
+            choices=Product.Status.values,
+            default=Product.Status.DRAFT,
+            help="Status of the imported products",
+        )
+        parser.add_argument(
+            "--default-price",
+            type=Decimal,
+            default=Decimal("0.00"),
+            help="Price used for records without one",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of records validated and inserted per transaction",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Number of threads hashing and copying image files",
+        )
+        parser.add_argument(
+            "--upsert",
+            action="store_true",
+            help=(
+                "Update the price, stock, attributes and image of variants whose "
+                "SKU already exists instead of skipping them. The feed's stock "
+                "is on hand; units reserved by carts are taken off it"
+            ),
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the checkpoint of a previous run and start from the top",
+        )
 
     def handle(self, *args, **options):
         base_path = options["base_path"]
@@ -27,84 +135,337 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR(f"JSON file not found: {json_path}"))
             return
 
-        try:
-            with open(json_path, "r", encoding="utf-8") as f:
-                products_data = json.load(f)
-            logger.info(f"Loaded {len(products_data)} products from {json_path}")
-        except Exception as e:
-            logger.error(f"Failed to load JSON: {e}")
-            self.stdout.write(self.style.ERROR("Failed to load JSON file"))
+        product_type = ProductType.objects.filter(name=options["product_type"]).first()
+        if product_type is None:
+            self.stdout.write(
+                self.style.ERROR(f"Product type not found: {options['product_type']}")
+            )
             return
 
-        imported_count = 0
-        skipped_count = 0
-        for data in products_data:
-            original_title = data.get("title", "Untitled")
-            clean_title = data.get("clean_title")
-            if not clean_title:
-                logger.warning(
-                    f"Skipping product without clean_title: {original_title}"
-                )
-                skipped_count += 1
-                continue
-
-            local_image_path = data.get("local_image_path")
-            full_image_path = os.path.join(base_path, local_image_path)
-            if not local_image_path or not os.path.exists(full_image_path):
-                logger.warning(
-                    f"Skipping product without valid image path: {original_title}"
-                )
-                skipped_count += 1
-                continue
-
-            try:
-                product = Product(title=clean_title)
-                with open(full_image_path, "rb") as img_file:
-                    product.image.save(
-                        os.path.basename(full_image_path), File(img_file)
-                    )
-                product.save()
-                logger.info(f"Created Product: {clean_title}")
-
-                sku = data.get("sku", "")
-                height = data.get("height_cm", 0.00)
-                width = data.get("width_cm", 0.00)
-                length = data.get("depth_cm", 0.00)
-                external_url = data.get("product_page_url", "")
-
-                variant = ProductVariant(
-                    product=product,
-                    sku=sku,
-                    height=height,
-                    width=width,
-                    length=length,
-                    stock_quantity=0,
-                    color="",
-                    external_url=external_url,
-                    regular_price=1.99,
+        self.base_path = base_path
+        self.options = options
+        self.product_type = product_type
+        self.stats = {
+            "inserted": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "skipped": 0,
+            "images_copied": 0,
+            "images_reused": 0,
+        }
+
+        checkpoint_path = os.path.join(base_path, CHECKPOINT_FILENAME)
+        feed = self.get_feed_fingerprint(json_path)
+        processed = (
+            0 if options["restart"] else self.read_checkpoint(checkpoint_path, feed)
+        )
+        if processed:
+            self.stdout.write(f"Resuming after {processed} records")
+
+        started = time.perf_counter()
+        with (
+            open(json_path, "rb") as f,
+            ThreadPoolExecutor(max_workers=options["workers"]) as pool,
+        ):
+            # Floats, not Decimals: attributes and specifications are JSONFields.
+            records = islice(ijson.items(f, "item", use_float=True), processed, None)
+            while batch := list(islice(records, options["batch_size"])):
+                self.import_batch(batch, pool)
+                processed += len(batch)
+                self.write_checkpoint(checkpoint_path, feed, processed)
+
+                elapsed = time.perf_counter() - started
+                done = sum(
+                    self.stats[key]
+                    for key in ("inserted", "updated", "unchanged", "skipped")
                 )
-                with open(full_image_path, "rb") as img_file:
-                    variant.image.save(
-                        os.path.basename(full_image_path), File(img_file)
-                    )
-                variant.save()
-                logger.info(f"Created ProductVariant for SKU: {sku}")
-
-                imported_count += 1
-                self.stdout.write(self.style.SUCCESS(f"Imported {clean_title}"))
-
-            except Exception as e:
-                logger.error(f"Error importing product {original_title}: {e}")
                 self.stdout.write(
-                    self.style.ERROR(f"Error importing {original_title}: {str(e)}")
+                    f"{processed} records processed, {done / elapsed:.0f} records/s"
                 )
-                skipped_count += 1
 
-        logger.info(
-            f"Import completed. Imported: {imported_count}, Skipped/Errored: {skipped_count}"
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        elapsed = time.perf_counter() - started
+        summary = (
+            f"Import completed in {elapsed:.1f}s. "
+            f"Inserted: {self.stats['inserted']}, "
+            f"Updated: {self.stats['updated']}, "
+            f"Unchanged: {self.stats['unchanged']}, "
+            f"Skipped/Errored: {self.stats['skipped']}, "
+            f"Images copied: {self.stats['images_copied']}, "
+            f"Images reused: {self.stats['images_reused']}"
         )
-        self.stdout.write(
-            self.style.SUCCESS(
-                f"Import completed. Imported: {imported_count}, Skipped/Errored: {skipped_count}"
+        logger.info(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def import_batch(self, records, pool):
+        rows = []
+        for record in records:
+            row = self.parse_record(record)
+            if row is None:
+                self.stats["skipped"] += 1
+            else:
+                rows.append(row)
+
+        # Every record becomes a variant of the same product type.
+        attribute_errors = validate_variants_bulk(
+            [ProductVariant(attributes=row["attributes"]) for row in rows],
+            product_type=self.product_type,
+        )
+        valid_rows = []
+        for row, errors in zip(rows, attribute_errors):
+            if errors:
+                logger.warning(f"Skipping {row['sku']}: {' '.join(errors)}")
+                self.stats["skipped"] += 1
+            else:
+                valid_rows.append(row)
+        rows = valid_rows
+
+        existing = {
+            variant["sku"]: variant
+            for variant in ProductVariant.objects.filter(
+                sku__in=[row["sku"] for row in rows]
             )
+            .annotate(reserved=reserved_quantity())
+            .values(*EXISTING_VARIANT_FIELDS, "reserved")
+        }
+
+        new_rows = []
+        existing_rows = []
+        seen_skus = set()
+        for row in rows:
+            if row["sku"] in seen_skus:
+                logger.warning(f"Skipping duplicate SKU in feed: {row['sku']}")
+                self.stats["skipped"] += 1
+            elif row["sku"] not in existing:
+                new_rows.append(row)
+            elif self.options["upsert"]:
+                existing_rows.append(row)
+            else:
+                logger.warning(f"Skipping existing SKU: {row['sku']}")
+                self.stats["skipped"] += 1
+            seen_skus.add(row["sku"])
+
+        digests = self.hash_files(
+            [row["image_path"] for row in new_rows + existing_rows], pool
         )
+
+        changed_rows = []
+        for row in existing_rows:
+            variant = existing[row["sku"]]
+            image_changed = not is_stored_image(
+                variant["image"], digests[row["image_path"]]
+            )
+            available = get_available_stock(row["stock_quantity"], variant["reserved"])
+            if (
+                image_changed
+                or available != variant["stock_quantity"]
+                or any(
+                    row[field] != variant[field] for field in ("price", "attributes")
+                )
+            ):
+                changed_rows.append((row, variant, image_changed))
+            else:
+                self.stats["unchanged"] += 1
+
+        if not new_rows and not changed_rows:
+            return
+
+        # Unchanged pictures of existing variants are neither copied nor touched.
+        image_names = self.store_images(
+            {
+                row["image_path"]: digests[row["image_path"]]
+                for row in new_rows
+                + [row for row, _, image_changed in changed_rows if image_changed]
+            },
+            pool,
+        )
+
+        products = []
+        variants = []
+        for row in new_rows:
+            image_name = image_names[row["image_path"]]
+            product = Product(
+                product_type=self.product_type,
+                status=self.options["status"],
+                title=row["title"],
+                thumbnail=image_name,
+                specifications=row["specifications"],
+                base_price=row["price"],
+            )
+            products.append(product)
+            variants.append(
+                ProductVariant(
+                    product=product,
+                    sku=row["sku"],
+                    price=row["price"],
+                    stock_quantity=row["stock_quantity"],
+                    image=image_name,
+                    attributes=row["attributes"],
+                )
+            )
+
+        repriced = [
+            Product(pk=variant["product_id"], base_price=row["price"])
+            for row, variant, _ in changed_rows
+            if row["price"] != variant["price"]
+        ]
+
+        with transaction.atomic():
+            assign_unique_slugs(products)
+            Product.objects.bulk_create(products)
+            ProductVariant.objects.bulk_create(variants)
+
+            # bulk_create skips Product.save and the signal handlers.
+            product_ids = [product.pk for product in products]
+            Product.objects.filter(pk__in=product_ids).update(
+                search_vector=product_search_vector()
+            )
+
+            # Lock the variants before reading their reservations, in the order
+            # adjust_stock locks them, so no cart reserves in between.
+            reserved = dict(
+                ProductVariant.objects.select_for_update()
+                .filter(sku__in=[row["sku"] for row, _, _ in changed_rows])
+                .order_by("pk")
+                .annotate(reserved=reserved_quantity())
+                .values_list("sku", "reserved")
+            )
+            upserts = [
+                ProductVariant(
+                    product_id=variant["product_id"],
+                    sku=row["sku"],
+                    price=row["price"],
+                    stock_quantity=get_available_stock(
+                        row["stock_quantity"], reserved.get(row["sku"], 0)
+                    ),
+                    image=image_names.get(row["image_path"], variant["image"]),
+                    attributes=row["attributes"],
+                )
+                for row, variant, _ in changed_rows
+            ]
+            ProductVariant.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=["sku"],
+                update_fields=VARIANT_UPSERT_FIELDS,
+            )
+            Product.objects.bulk_update(repriced, ["base_price"])
+
+            refresh_product_listings(
+                product_ids + [variant.product_id for variant in upserts]
+            )
+            invalidate_on_commit("products", "featured-products")
+            for name in set(image_names.values()):
+                generate_renditions_on_commit(name)
+            if upserts:
+                invalidate_on_commit("product-details")
+
+        self.stats["inserted"] += len(products)
+        self.stats["updated"] += len(upserts)
+
+    def parse_record(self, record):
+        """Validate a feed record; returns None (and logs why) if it's unusable."""
+        original_title = record.get("title", "Untitled")
+        clean_title = record.get("clean_title")
+        if not clean_title:
+            logger.warning(f"Skipping product without clean_title: {original_title}")
+            return None
+
+        sku = record.get("sku")
+        if not sku:
+            logger.warning(f"Skipping product without sku: {original_title}")
+            return None
+
+        local_image_path = record.get("local_image_path")
+        full_image_path = os.path.join(self.base_path, local_image_path or "")
+        if not local_image_path or not os.path.isfile(full_image_path):
+            logger.warning(
+                f"Skipping product without valid image path: {original_title}"
+            )
+            return None
+
+        try:
+            price = Decimal(str(record.get("price", self.options["default_price"])))
+            stock_quantity = int(record.get("stock_quantity", 0))
+        except (InvalidOperation, TypeError, ValueError):
+            logger.warning(f"Skipping product with invalid price/stock: {sku}")
+            return None
+
+        return {
+            "title": clean_title,
+            "sku": sku,
+            "price": price,
+            "stock_quantity": stock_quantity,
+            "attributes": record.get("attributes") or {},
+            "image_path": full_image_path,
+            "specifications": {
+                field: record[field]
+                for field in SPECIFICATION_FIELDS
+                if record.get(field) not in (None, "")
+            },
+        }
+
+    def hash_files(self, paths, pool):
+        """Returns {path: SHA-256 hex digest} for the distinct paths."""
+        paths = list(dict.fromkeys(paths))
+        return dict(zip(paths, pool.map(self.hash_file, paths)))
+
+    def store_images(self, digests, pool):
+        """
+        Copy each distinct image of {path: digest} once, named by its content
+        hash, so the same picture is stored once however many records or runs
+        use it. Returns {path: storage name}.
+        """
+        sources = {}
+        for path, digest in digests.items():
+            sources.setdefault(digest, path)
+
+        stored = {}
+        for digest, (name, copied) in zip(
+            sources, pool.map(self.store_image, sources.items())
+        ):
+            stored[digest] = name
+            self.stats["images_copied" if copied else "images_reused"] += 1
+        return {path: stored[digest] for path, digest in digests.items()}
+
+    def hash_file(self, path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def store_image(self, item):
+        digest, path = item
+        extension = os.path.splitext(path)[1].lower()
+        name = get_image_name(digest, extension)
+        if default_storage.exists(name):
+            return name, False
+
+        with open(path, "rb") as f:
+            return default_storage.save(name, File(f)), True
+
+    def get_feed_fingerprint(self, path):
+        """Size and mtime of the feed; a checkpoint only resumes the same file."""
+        stat = os.stat(path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def read_checkpoint(self, path, feed):
+        if not os.path.exists(path):
+            return 0
+        with open(path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("feed") != feed:
+            logger.warning("Ignoring the checkpoint of a different feed file")
+            self.stdout.write("The feed changed since the checkpoint; starting over")
+            return 0
+        return checkpoint["processed"]
+
+    def write_checkpoint(self, path, feed, processed):
+        # Write then rename, so a crash never leaves a half-written checkpoint.
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"feed": feed, "processed": processed}, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,32 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from products.listings import refresh_product_listings
+from products.models import Product
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized ProductListing rows for every product"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of products refreshed per batch",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        product_ids = list(Product.objects.order_by("id").values_list("id", flat=True))
+
+        for start in range(0, len(product_ids), batch_size):
+            refresh_product_listings(product_ids[start : start + batch_size])
+
+        logger.info(f"Refreshed listings for {len(product_ids)} products")
+        self.stdout.write(
+            self.style.SUCCESS(f"Refreshed listings for {len(product_ids)} products")
+        )
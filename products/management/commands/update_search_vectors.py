@@ -0,0 +1,44 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from products.models import Product, product_search_vector
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Backfill Product.search_vector for existing products in id batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of product ids updated per statement",
+        )
+        parser.add_argument(
+            "--missing-only",
+            action="store_true",
+            help="Only fill products that have no search vector yet",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        queryset = Product.objects.all()
+        if options["missing_only"]:
+            queryset = queryset.filter(search_vector__isnull=True)
+
+        max_id = queryset.aggregate(max_id=Max("id"))["max_id"] or 0
+
+        updated_count = 0
+        for start in range(0, max_id + 1, batch_size):
+            updated_count += queryset.filter(
+                id__gte=start, id__lt=start + batch_size
+            ).update(search_vector=product_search_vector())
+
+        logger.info(f"Updated search vectors for {updated_count} products")
+        self.stdout.write(
+            self.style.SUCCESS(f"Updated search vectors for {updated_count} products")
+        )
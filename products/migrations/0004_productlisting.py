@@ -0,0 +1,83 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:31
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0003_product_search_vector"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductListing",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="listing",
+                        serialize=False,
+                        to="products.product",
+                    ),
+                ),
+                (
+                    "min_price",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                (
+                    "max_price",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                ("total_stock", models.PositiveIntegerField(default=0)),
+                ("variant_count", models.PositiveIntegerField(default=0)),
+                (
+                    "category_slugs",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.SlugField(max_length=255),
+                        default=list,
+                        size=None,
+                    ),
+                ),
+                (
+                    "category_names",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=255),
+                        default=list,
+                        size=None,
+                    ),
+                ),
+                (
+                    "collection_slugs",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.SlugField(max_length=255),
+                        default=list,
+                        size=None,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Product Listing",
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["category_slugs"], name="listing_category_slugs_gin"
+                    ),
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["collection_slugs"], name="listing_collection_slugs_gin"
+                    ),
+                    models.Index(
+                        fields=["min_price"], name="products_pr_min_pri_e68722_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
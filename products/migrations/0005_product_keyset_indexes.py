@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_productlisting"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["status", "created_at", "id"],
+                name="products_pr_status_0db408_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["status", "base_price", "id"],
+                name="products_pr_status_a765c9_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:35
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_published_product_count(apps, schema_editor):
+    Collection = apps.get_model("products", "Collection")
+    published = (
+        Collection.products.through.objects.filter(
+            collection_id=OuterRef("pk"), product__status="PUBLISHED"
+        )
+        .values("collection_id")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    Collection.objects.update(published_product_count=Coalesce(Subquery(published), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0005_product_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="collection",
+            name="published_product_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            populate_published_product_count, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,79 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count, Max, Min, Sum
+
+BATCH_SIZE = 1000
+
+
+def populate_product_listings(apps, schema_editor):
+    """Build the listing row of every product, as products.listings does."""
+    Product = apps.get_model("products", "Product")
+    ProductVariant = apps.get_model("products", "ProductVariant")
+    ProductListing = apps.get_model("products", "ProductListing")
+    Collection = apps.get_model("products", "Collection")
+
+    product_ids = list(
+        Product.objects.exclude(listing__isnull=False)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        batch = product_ids[start : start + BATCH_SIZE]
+
+        variant_stats = {
+            row["product_id"]: row
+            for row in ProductVariant.objects.filter(product_id__in=batch)
+            .values("product_id")
+            .annotate(
+                min_price=Min("price"),
+                max_price=Max("price"),
+                total_stock=Sum("stock_quantity"),
+                variant_count=Count("id"),
+            )
+            .order_by()
+        }
+
+        categories = defaultdict(list)
+        for product_id, slug, title in (
+            Product.categories.through.objects.filter(product_id__in=batch)
+            .order_by("category__title")
+            .values_list("product_id", "category__slug", "category__title")
+        ):
+            categories[product_id].append((slug, title))
+
+        collections = defaultdict(list)
+        for product_id, slug in (
+            Collection.products.through.objects.filter(product_id__in=batch)
+            .order_by("collection__slug")
+            .values_list("product_id", "collection__slug")
+        ):
+            collections[product_id].append(slug)
+
+        listings = []
+        for product_id in batch:
+            stats = variant_stats.get(product_id, {})
+            listings.append(
+                ProductListing(
+                    product_id=product_id,
+                    min_price=stats.get("min_price"),
+                    max_price=stats.get("max_price"),
+                    total_stock=stats.get("total_stock") or 0,
+                    variant_count=stats.get("variant_count") or 0,
+                    category_slugs=[slug for slug, _ in categories[product_id]],
+                    category_names=[title for _, title in categories[product_id]],
+                    collection_slugs=collections[product_id],
+                )
+            )
+        ProductListing.objects.bulk_create(listings)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_collection_published_product_count"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_product_listings, migrations.RunPython.noop),
+    ]
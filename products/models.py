@@ -1,15 +1,17 @@
 import uuid
 
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
 from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.utils.text import slugify
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Cast, Coalesce
 from django.utils.translation import gettext_lazy as _
 from mptt.fields import TreeForeignKey
 from mptt.models import MPTTModel
 
-from common.models import TimestampedModel
-from common.utils import get_unique_slug
+from common.models import LoadedValuesMixin, TimestampedModel, UniqueSlugMixin
 
 
 def get_product_slug(instance):
@@ -42,6 +44,24 @@ def product_gallery_upload_to(instance, filename):
     return f"products/{slug}/gallery/{uuid.uuid4()}.{ext}"
 
 
+SEARCH_CONFIG = "english"
+
+SEARCH_VECTOR_FIELDS = {"title", "description", "specifications"}
+
+
+def product_search_vector():
+    """Weighted document for Product.search_vector: title > description > specs."""
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="B", config=SEARCH_CONFIG)
+        + SearchVector(
+            Cast("specifications", models.TextField()),
+            weight="C",
+            config=SEARCH_CONFIG,
+        )
+    )
+
+
 class Attribute(models.Model):
 
     name = models.CharField(max_length=255, verbose_name=_("Attribute Name"))
@@ -65,7 +85,7 @@ class ProductType(models.Model):
         return self.name
 
 
-class Category(MPTTModel, TimestampedModel):
+class Category(LoadedValuesMixin, UniqueSlugMixin, MPTTModel, TimestampedModel):
     title = models.CharField(max_length=255, verbose_name=_("Category Name"))
     slug = models.SlugField(max_length=255, unique=True, blank=True)
     parent = TreeForeignKey(
@@ -90,19 +110,51 @@ class Category(MPTTModel, TimestampedModel):
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = get_unique_slug(self.__class__, slugify(self.title), self)
-        super().save(*args, **kwargs)
+
+class CollectionQuerySet(models.QuerySet):
+    def listed(self):
+        """Active collections by title, annotated with 'product_count'."""
+        queryset = self.filter(is_active=True).order_by("title")
+        if settings.COLLECTION_PRODUCT_COUNTER_ENABLED:
+            # Maintained by signals, so the listing never joins products.
+            return queryset.annotate(product_count=models.F("published_product_count"))
+        return queryset.with_published_product_count()
+
+    def with_published_product_count(self):
+        """Annotate 'product_count' with a COUNT over published products."""
+        return self.annotate(
+            product_count=models.Count(
+                "products",
+                filter=models.Q(products__status=Product.Status.PUBLISHED),
+            )
+        )
+
+    def refresh_published_product_counts(self):
+        """Recompute the stored counter of every collection in one UPDATE."""
+        published = (
+            Collection.products.through.objects.filter(
+                collection_id=models.OuterRef("pk"),
+                product__status=Product.Status.PUBLISHED,
+            )
+            .values("collection_id")
+            .annotate(count=models.Count("*"))
+            .values("count")
+        )
+        return self.update(
+            published_product_count=Coalesce(models.Subquery(published), 0)
+        )
 
 
-class Collection(TimestampedModel):
+class Collection(LoadedValuesMixin, UniqueSlugMixin, TimestampedModel):
     title = models.CharField(max_length=255, verbose_name=_("Collection Name"))
     slug = models.SlugField(max_length=255, unique=True, blank=True)
     description = models.TextField(blank=True)
     products = models.ManyToManyField("Product", related_name="collections", blank=True)
     image = models.ImageField(upload_to="collections/", null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    published_product_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CollectionQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("Collection")
@@ -111,13 +163,8 @@ class Collection(TimestampedModel):
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = get_unique_slug(self.__class__, slugify(self.title), self)
-        super().save(*args, **kwargs)
-
 
-class Product(TimestampedModel):
+class Product(LoadedValuesMixin, UniqueSlugMixin, TimestampedModel):
     class Status(models.TextChoices):
         DRAFT = "DRAFT", _("Draft")
         ARCHIVED = "ARCHIVED", _("Archived")
@@ -144,23 +191,36 @@ class Product(TimestampedModel):
     thumbnail = models.ImageField(upload_to=product_thumbnail_upload_to)
     specifications = models.JSONField(default=dict, blank=True)
     base_price = models.DecimalField(max_digits=10, decimal_places=2, default="0.00")
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         indexes = [
             models.Index(fields=["slug"]),
             models.Index(fields=["status"]),
+            # Keyset pagination: ordering field plus id as the tie-breaker.
+            models.Index(fields=["status", "created_at", "id"]),
+            models.Index(fields=["status", "base_price", "id"]),
+            GinIndex(fields=["search_vector"], name="product_search_vector_gin"),
+            GinIndex(
+                fields=["title"], opclasses=["gin_trgm_ops"], name="product_title_trgm"
+            ),
         ]
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = get_unique_slug(self.__class__, slugify(self.title), self)
         super().save(*args, **kwargs)
 
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or SEARCH_VECTOR_FIELDS.intersection(update_fields):
+            self.update_search_vector()
+
+    def update_search_vector(self):
+        Product.objects.filter(pk=self.pk).update(search_vector=product_search_vector())
+
     def __str__(self):
         return self.title
 
 
-class ProductVariant(TimestampedModel):
+class ProductVariant(LoadedValuesMixin, TimestampedModel):
     product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name="variants"
     )
@@ -194,42 +254,34 @@ class ProductVariant(TimestampedModel):
     def clean(self):
         super().clean()
 
-        if not hasattr(self, "product") or not self.product.product_type:
+        if not hasattr(self, "product") or not self.product.product_type_id:
             return
 
-        # 1. Fetch Rules
-        allowed_attrs_qs = self.product.product_type.allowed_attributes.all()
-        allowed_map = {attr.slug: attr.choices for attr in allowed_attrs_qs}
-
-        submitted_keys = set(self.attributes.keys())
-        allowed_keys = set(allowed_map.keys())
-
-        # 2. Check for Forbidden Attributes (Security)
-        invalid_keys = submitted_keys - allowed_keys
-        if invalid_keys:
-            raise ValidationError(
-                f"Attributes {invalid_keys} are not allowed for this product type."
-            )
+        from products.attributes import validate_variants_bulk
 
-        # 3. Check for Missing Required Attributes (Integrity)
-        missing_keys = allowed_keys - submitted_keys
-        if missing_keys:
-            raise ValidationError(f"Missing required attributes: {missing_keys}")
-
-        # 4. Check Values against Choices (Business Logic)
-        for key, value in self.attributes.items():
-            valid_choices = allowed_map.get(key)
-            if valid_choices and value not in valid_choices:
-                raise ValidationError(
-                    f"Value '{value}' is not valid for '{key}'. Allowed: {valid_choices}"
-                )
+        errors = validate_variants_bulk([self])[0]
+        if errors:
+            raise ValidationError(errors)
 
     def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
-
-
-class ProductGalleryImage(TimestampedModel):
+        # The product foreign key, uniqueness and constraints are enforced by
+        # the database (and by model forms before they save), so only the
+        # checks that need no queries run here.
+        self.full_clean(
+            exclude=["product"], validate_unique=False, validate_constraints=False
+        )
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+        except IntegrityError:
+            # A taken SKU or attribute combination is reported the way a model
+            # form would; anything else is left as is.
+            self.validate_unique()
+            self.validate_constraints()
+            raise
+
+
+class ProductGalleryImage(LoadedValuesMixin, TimestampedModel):
     product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name="gallery_images"
     )
@@ -247,3 +299,40 @@ class ProductGalleryImage(TimestampedModel):
     class Meta:
         verbose_name = _("Gallery Image")
         verbose_name_plural = _("Gallery Images")
+
+
+class ProductListing(models.Model):
+    """
+    Denormalized per-product summary the product list is served from.
+    Rows are rebuilt by products.listings.refresh_product_listings.
+    """
+
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name="listing"
+    )
+    min_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    max_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    total_stock = models.PositiveIntegerField(default=0)
+    variant_count = models.PositiveIntegerField(default=0)
+    category_slugs = ArrayField(models.SlugField(max_length=255), default=list)
+    category_names = ArrayField(models.CharField(max_length=255), default=list)
+    collection_slugs = ArrayField(models.SlugField(max_length=255), default=list)
+
+    class Meta:
+        verbose_name = _("Product Listing")
+        indexes = [
+            GinIndex(fields=["category_slugs"], name="listing_category_slugs_gin"),
+            GinIndex(fields=["collection_slugs"], name="listing_collection_slugs_gin"),
+            models.Index(fields=["min_price"]),
+        ]
+
+    def __str__(self):
+        return f"Listing for product {self.product_id}"
+
+    @property
+    def in_stock(self):
+        return self.total_stock > 0
@@ -0,0 +1,138 @@
+import json
+from base64 import b64decode, b64encode
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+KeysetCursor = namedtuple("KeysetCursor", ["value", "pk", "reverse"])
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Keyset pagination ordered by '<ordering field>, id'.
+    - The ordering comes from the view's OrderingFilter param (view.ordering_fields)
+    - 'id' breaks ties, so every row has a unique position
+    - Cursors carry the (value, id) of the boundary row, so page N costs the
+      same index range scan as page 1: no COUNT(*) and no OFFSET
+
+    The composite (field, id) indexes on the model serve both directions.
+    """
+
+    ordering = "-created_at"
+    ordering_param = "ordering"
+
+    def get_ordering(self, request, queryset, view):
+        allowed = getattr(view, "ordering_fields", None) or []
+        params = request.query_params.get(self.ordering_param, "")
+
+        for term in (param.strip() for param in params.split(",")):
+            if term.lstrip("-") in allowed:
+                return term
+        return self.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        ordering = self.get_ordering(request, queryset, view)
+        self.model = queryset.model
+        self.field = ordering.lstrip("-")
+        self.descending = ordering.startswith("-")
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor.reverse if self.cursor else False
+        descending = self.descending != reverse
+
+        if self.cursor:
+            queryset = queryset.filter(
+                self.get_after_filter(self.cursor.value, self.cursor.pk, descending)
+            )
+
+        prefix = "-" if descending else ""
+        queryset = queryset.order_by(f"{prefix}{self.field}", f"{prefix}id")
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        if reverse:
+            self.has_next = self.cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_after_filter(self, value, pk, descending):
+        """
+        Rows strictly after (value, pk) in the given direction. The redundant
+        range on the field lets Postgres seek the composite index directly.
+        """
+        if descending:
+            return Q(**{f"{self.field}__lte": value}) & (
+                Q(**{f"{self.field}__lt": value})
+                | Q(**{self.field: value, "id__lt": pk})
+            )
+        return Q(**{f"{self.field}__gte": value}) & (
+            Q(**{f"{self.field}__gt": value}) | Q(**{self.field: value, "id__gt": pk})
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_boundary(self.page[-1], reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.get_boundary(self.page[0], reverse=True))
+
+    def get_boundary(self, item, reverse):
+        if isinstance(item, dict):
+            return KeysetCursor(item[self.field], item["id"], reverse)
+        return KeysetCursor(getattr(item, self.field), item.id, reverse)
+
+    def encode_cursor(self, cursor):
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_position(cursor)
+        )
+
+    def encode_position(self, cursor):
+        payload = {"v": str(cursor.value), "i": cursor.pk, "o": self.ordering_key}
+        if cursor.reverse:
+            payload["r"] = 1
+        return b64encode(json.dumps(payload).encode("ascii")).decode("ascii")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            payload = json.loads(b64decode(encoded.encode("ascii")).decode("ascii"))
+            if payload["o"] != self.ordering_key:
+                raise ValueError("Cursor was issued for a different ordering")
+            field = self.model._meta.get_field(self.field)
+            return KeysetCursor(
+                value=field.to_python(payload["v"]),
+                pk=int(payload["i"]),
+                reverse=bool(payload.get("r")),
+            )
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @property
+    def ordering_key(self):
+        return f"-{self.field}" if self.descending else self.field
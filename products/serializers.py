@@ -1,5 +1,14 @@
 from rest_framework import serializers
 
+from common.renditions import ImageRenditionsField
+from common.serializers import (
+    Image,
+    ImageRenditions,
+    MeasuredSerializerMixin,
+    Value,
+    ValuesSerializer,
+)
+
 from .models import (
     Attribute,
     Category,
@@ -14,6 +23,8 @@ from .models import (
 
 
 class CategorySerializer(serializers.ModelSerializer):
+    image_renditions = ImageRenditionsField(source="image")
+
     class Meta:
         model = Category
         fields = [
@@ -22,12 +33,14 @@ class CategorySerializer(serializers.ModelSerializer):
             "slug",
             "description",
             "image",
+            "image_renditions",
             "parent",
         ]
 
 
-class CategoryTreeSerializer(serializers.ModelSerializer):
+class CategoryTreeSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     children = serializers.SerializerMethodField()
+    image_renditions = ImageRenditionsField(source="image")
 
     class Meta:
         model = Category
@@ -36,14 +49,13 @@ class CategoryTreeSerializer(serializers.ModelSerializer):
             "title",
             "slug",
             "image",
+            "image_renditions",
             "children",
         ]
 
     def get_children(self, obj):
-        if hasattr(obj, "children_prefetched"):
-            children = obj.children_prefetched
-        else:
-            children = obj.get_children()
+        # Uses the in-memory children when the tree came from get_cached_trees().
+        children = obj.get_children()
 
         if children:
             return CategoryTreeSerializer(
@@ -56,7 +68,8 @@ class CategoryTreeSerializer(serializers.ModelSerializer):
 
 
 class CollectionSerializer(serializers.ModelSerializer):
-    product_count = serializers.IntegerField(source="products.count", read_only=True)
+    product_count = serializers.IntegerField(read_only=True)
+    image_renditions = ImageRenditionsField(source="image")
 
     class Meta:
         model = Collection
@@ -66,6 +79,7 @@ class CollectionSerializer(serializers.ModelSerializer):
             "slug",
             "description",
             "image",
+            "image_renditions",
             "is_active",
             "product_count",
         ]
@@ -91,13 +105,23 @@ class ProductTypeSerializer(serializers.ModelSerializer):
 
 
 class ProductGalleryImageSerializer(serializers.ModelSerializer):
+    image_renditions = ImageRenditionsField(source="image")
+
     class Meta:
         model = ProductGalleryImage
-        fields = ["id", "image", "alt_text", "is_feature", "variant"]
+        fields = [
+            "id",
+            "image",
+            "image_renditions",
+            "alt_text",
+            "is_feature",
+            "variant",
+        ]
 
 
 class ProductVariantSerializer(serializers.ModelSerializer):
     is_in_stock = serializers.SerializerMethodField()
+    image_renditions = ImageRenditionsField(source="image")
 
     class Meta:
         model = ProductVariant
@@ -109,6 +133,7 @@ class ProductVariantSerializer(serializers.ModelSerializer):
             "stock_quantity",
             "is_in_stock",
             "image",
+            "image_renditions",
             "attributes",
         ]
 
@@ -117,7 +142,20 @@ class ProductVariantSerializer(serializers.ModelSerializer):
 
 
 class ProductListSerializer(serializers.ModelSerializer):
-    category_names = serializers.StringRelatedField(source="categories", many=True)
+    """Reads its summary fields from the denormalized ProductListing row."""
+
+    category_names = serializers.ListField(
+        source="listing.category_names", child=serializers.CharField()
+    )
+    min_price = serializers.DecimalField(
+        source="listing.min_price", max_digits=10, decimal_places=2
+    )
+    max_price = serializers.DecimalField(
+        source="listing.max_price", max_digits=10, decimal_places=2
+    )
+    in_stock = serializers.BooleanField(source="listing.in_stock")
+    variant_count = serializers.IntegerField(source="listing.variant_count")
+    thumbnail_renditions = ImageRenditionsField(source="thumbnail")
 
     class Meta:
         model = Product
@@ -127,17 +165,23 @@ class ProductListSerializer(serializers.ModelSerializer):
             "slug",
             "status",
             "thumbnail",
+            "thumbnail_renditions",
             "base_price",
+            "min_price",
+            "max_price",
+            "in_stock",
+            "variant_count",
             "category_names",
             "created_at",
         ]
 
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     product_type = ProductTypeSerializer(read_only=True)
     variants = ProductVariantSerializer(many=True, read_only=True)
     gallery_images = ProductGalleryImageSerializer(many=True, read_only=True)
     categories = CategorySerializer(many=True, read_only=True)
+    thumbnail_renditions = ImageRenditionsField(source="thumbnail")
 
     class Meta:
         model = Product
@@ -149,9 +193,66 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             "description",
             "base_price",
             "thumbnail",
+            "thumbnail_renditions",
             "specifications",
             "product_type",
             "categories",
             "variants",
             "gallery_images",
         ]
+
+
+# --- VALUES SERIALIZERS ---
+# .values() twins of the list serializers above, for the high-volume list
+# endpoints (see common.serializers); they render the same documents.
+
+price_to_representation = serializers.DecimalField(
+    max_digits=10, decimal_places=2
+).to_representation
+
+
+class CategoryValuesSerializer(ValuesSerializer):
+    fields = {
+        "id": Value("id"),
+        "title": Value("title"),
+        "slug": Value("slug"),
+        "description": Value("description"),
+        "image": Image("image", Category),
+        "image_renditions": ImageRenditions("image", Category),
+        "parent": Value("parent"),
+    }
+
+
+class CollectionValuesSerializer(ValuesSerializer):
+    """Expects the 'product_count' annotation, like CollectionSerializer."""
+
+    fields = {
+        "id": Value("id"),
+        "title": Value("title"),
+        "slug": Value("slug"),
+        "description": Value("description"),
+        "image": Image("image", Collection),
+        "image_renditions": ImageRenditions("image", Collection),
+        "is_active": Value("is_active"),
+        "product_count": Value("product_count"),
+    }
+
+
+class ProductListValuesSerializer(ValuesSerializer):
+    fields = {
+        "id": Value("id"),
+        "title": Value("title"),
+        "slug": Value("slug"),
+        "status": Value("status"),
+        "thumbnail": Image("thumbnail", Product),
+        "thumbnail_renditions": ImageRenditions("thumbnail", Product),
+        "base_price": Value("base_price", price_to_representation),
+        "min_price": Value("listing__min_price", price_to_representation),
+        "max_price": Value("listing__max_price", price_to_representation),
+        "in_stock": Value("listing__total_stock", lambda total_stock: total_stock > 0),
+        "variant_count": Value("listing__variant_count"),
+        "category_names": Value("listing__category_names"),
+        "created_at": Value(
+            "created_at", serializers.DateTimeField().to_representation
+        ),
+    }
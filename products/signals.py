@@ -0,0 +1,212 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from mptt.signals import node_moved
+
+from common.cache import bump_namespaces, invalidate_on_commit
+from common.renditions import generate_changed_renditions_on_commit
+from products.listings import refresh_listings_on_commit
+from products.models import (
+    Attribute,
+    Category,
+    Collection,
+    Product,
+    ProductGalleryImage,
+    ProductType,
+    ProductVariant,
+)
+
+
+def product_namespaces(*slugs):
+    return [f"product:{slug}" for slug in slugs if slug]
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product(sender, instance, **kwargs):
+    loaded_slug = getattr(instance, "_loaded_values", {}).get("slug")
+    invalidate_on_commit(
+        "products",
+        "collections",
+        "featured-products",
+        *product_namespaces(instance.slug, loaded_slug),
+    )
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=ProductGalleryImage)
+@receiver(post_delete, sender=ProductGalleryImage)
+def invalidate_product_detail(sender, instance, **kwargs):
+    slug = Product.objects.filter(pk=instance.product_id).values_list("slug", flat=True)
+    namespaces = product_namespaces(slug.first())
+    if sender is ProductVariant:
+        # Variant prices and stock are summarized on the product list.
+        namespaces += ["products", "featured-products"]
+    invalidate_on_commit(*namespaces)
+
+
+def invalidate_stock_on_commit(product_slugs, in_stock_changed=True):
+    """
+    What a variant save triggers, for stock written with QuerySet.update() or
+    raw SQL (e.g. reservations), which send no signals. 'product_slugs' maps
+    the ids of the products to their slugs. The product lists only show and
+    filter on availability, so they are left alone unless 'in_stock_changed'
+    says a variant went in or out of stock.
+    """
+    refresh_listings_on_commit(product_slugs)
+    namespaces = product_namespaces(*product_slugs.values())
+    if in_stock_changed:
+        namespaces += ["products", "featured-products"]
+    invalidate_on_commit(*namespaces)
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def invalidate_product_categories(sender, instance, action, **kwargs):
+    if not action.startswith("post_"):
+        return
+
+    if isinstance(instance, Product):
+        details = product_namespaces(instance.slug)
+    else:
+        details = ["product-details"]
+    invalidate_on_commit("products", "featured-products", *details)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(node_moved, sender=Category)
+def invalidate_category(sender, instance, **kwargs):
+    invalidate_on_commit(
+        "categories",
+        "products",
+        "product-details",
+        "featured-products",
+        "featured-categories",
+    )
+
+
+@receiver(post_save, sender=Collection)
+@receiver(post_delete, sender=Collection)
+@receiver(m2m_changed, sender=Collection.products.through)
+def invalidate_collection(sender, **kwargs):
+    if kwargs.get("action", "post_").startswith("post_"):
+        invalidate_on_commit("collections", "products")
+
+
+@receiver(post_save, sender=Attribute)
+@receiver(post_delete, sender=Attribute)
+@receiver(m2m_changed, sender=ProductType.allowed_attributes.through)
+def invalidate_attributes(sender, **kwargs):
+    if kwargs.get("action", "post_").startswith("post_"):
+        invalidate_on_commit("attributes", "product-details")
+
+
+# --- LISTING REFRESH ---
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def refresh_product_listing(sender, instance, **kwargs):
+    product_id = instance.pk if sender is Product else instance.product_id
+    refresh_listings_on_commit([product_id])
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+@receiver(m2m_changed, sender=Collection.products.through)
+def refresh_membership_listings(sender, instance, action, pk_set, **kwargs):
+    if isinstance(instance, Product):
+        if action.startswith("post_"):
+            refresh_listings_on_commit([instance.pk])
+        return
+
+    # The instance is a Category or Collection; pk_set holds product ids.
+    if action == "pre_clear":
+        instance._cleared_product_ids = list(
+            instance.products.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        refresh_listings_on_commit(getattr(instance, "_cleared_product_ids", []))
+    elif action in ("post_add", "post_remove"):
+        refresh_listings_on_commit(pk_set)
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+@receiver(post_save, sender=Collection)
+@receiver(pre_delete, sender=Collection)
+def refresh_group_listings(sender, instance, **kwargs):
+    if kwargs.get("created"):
+        return
+    refresh_listings_on_commit(instance.products.values_list("pk", flat=True))
+
+
+# --- COLLECTION COUNTERS ---
+
+
+def refresh_collection_counts_on_commit(collection_ids):
+    collection_ids = list(collection_ids)
+    if not collection_ids:
+        return
+
+    def refresh():
+        Collection.objects.filter(
+            pk__in=collection_ids
+        ).refresh_published_product_counts()
+        bump_namespaces("collections")
+
+    transaction.on_commit(refresh)
+
+
+@receiver(m2m_changed, sender=Collection.products.through)
+def refresh_membership_counts(sender, instance, action, pk_set, **kwargs):
+    if isinstance(instance, Collection):
+        if action.startswith("post_"):
+            refresh_collection_counts_on_commit([instance.pk])
+        return
+
+    # The instance is a Product; pk_set holds collection ids.
+    if action == "pre_clear":
+        instance._cleared_collection_ids = list(
+            instance.collections.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        refresh_collection_counts_on_commit(
+            getattr(instance, "_cleared_collection_ids", [])
+        )
+    elif action in ("post_add", "post_remove"):
+        refresh_collection_counts_on_commit(pk_set)
+
+
+@receiver(post_save, sender=Product)
+def refresh_status_counts(sender, instance, created, **kwargs):
+    loaded_status = getattr(instance, "_loaded_values", {}).get("status")
+    if not created and loaded_status != instance.status:
+        refresh_collection_counts_on_commit(
+            instance.collections.values_list("pk", flat=True)
+        )
+
+
+@receiver(pre_delete, sender=Product)
+def refresh_deleted_product_counts(sender, instance, **kwargs):
+    if instance.status == Product.Status.PUBLISHED:
+        refresh_collection_counts_on_commit(
+            instance.collections.values_list("pk", flat=True)
+        )
+
+
+# --- IMAGE RENDITIONS ---
+
+
+@receiver(post_save, sender=Product)
+def generate_thumbnail_renditions(sender, instance, **kwargs):
+    generate_changed_renditions_on_commit(instance, "thumbnail")
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_save, sender=ProductGalleryImage)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Collection)
+def generate_image_renditions(sender, instance, **kwargs):
+    generate_changed_renditions_on_commit(instance)
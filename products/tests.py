@@ -1 +1,675 @@
-# Create your tests here.
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from carts.models import Cart
+from carts.reservations import reserve_stock
+from products.attributes import validate_variants_bulk
+from products.categories import build_category_tree
+from products.listings import refresh_product_listings
+from products.models import (
+    Attribute,
+    Category,
+    Collection,
+    Product,
+    ProductGalleryImage,
+    ProductType,
+    ProductVariant,
+)
+from products.serializers import (
+    CollectionSerializer,
+    CollectionValuesSerializer,
+    ProductListSerializer,
+    ProductListValuesSerializer,
+)
+from products.views import CollectionListView, ProductViewSet
+
+
+def create_product(product_type, title, variants=(), **kwargs):
+    """A published product with a variant per (sku, price, attributes) tuple."""
+    product = Product.objects.create(
+        product_type=product_type,
+        title=title,
+        status=Product.Status.PUBLISHED,
+        thumbnail=f"products/{title}.jpg",
+        **kwargs,
+    )
+    for sku, price, attributes in variants:
+        ProductVariant.objects.create(
+            product=product,
+            sku=sku,
+            price=price,
+            stock_quantity=5,
+            image=f"variants/{sku}.jpg",
+            attributes=attributes,
+        )
+    return product
+
+
+def create_catalog():
+    """Published products with every field the catalog renders filled in."""
+    material = Attribute.objects.create(
+        name="Material", slug="material", choices=["bronze", "marble"]
+    )
+    finish = Attribute.objects.create(name="Finish", slug="finish")
+    product_type = ProductType.objects.create(name="Sculpture")
+    product_type.allowed_attributes.add(finish, material)
+
+    art = Category.objects.create(title="Art", image="categories/art.jpg")
+    busts = Category.objects.create(title="Busts", parent=art)
+    summer = Collection.objects.create(title="Summer", image="collections/summer.jpg")
+    Collection.objects.create(title="Winter", description="Cold & quiet")
+
+    products = []
+    for index, title in enumerate(["Héloïse", 'Bust "Two"', "Empty"]):
+        product = create_product(
+            product_type,
+            title,
+            description=f"Line one\nline <two> of {title}",
+            specifications={"height_cm": 30.5 + index, "notes": ["cast", None]},
+            base_price=f"{index}9.90",
+        )
+        products.append(product)
+    for index, product in enumerate(products[:2]):
+        product.categories.add(art, busts)
+        summer.products.add(product)
+        variants = [
+            ProductVariant.objects.create(
+                product=product,
+                sku=f"{product.pk}-{material}",
+                price=f"{index + 1}0.0{material_index}",
+                compare_at_price="99.99" if material_index else None,
+                stock_quantity=material_index * 3,
+                image=f"variants/{product.pk}-{material}.png",
+                attributes={"material": material, "finish": "matte"},
+            )
+            for material_index, material in enumerate(["bronze", "marble"])
+        ]
+        ProductGalleryImage.objects.create(
+            product=product, image=f"gallery/{product.pk}.jpg", alt_text="Front"
+        )
+        ProductGalleryImage.objects.create(
+            product=product,
+            variant=variants[1],
+            image=f"gallery/{product.pk}-side.jpg",
+            is_feature=True,
+        )
+    return products
+
+
+def render_both_ways(queryset, serializer_class, values_serializer_class):
+    """The JSON of 'queryset' rendered by a serializer and by its values twin."""
+    context = {"request": RequestFactory().get("/")}
+    renderer = JSONRenderer()
+    instances = serializer_class(list(queryset), many=True, context=context).data
+    values = values_serializer_class(
+        list(values_serializer_class.get_queryset(queryset)),
+        many=True,
+        context=context,
+    ).data
+    return renderer.render(instances), renderer.render(values)
+
+
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        material = Attribute.objects.create(
+            name="Material", slug="material", choices=["bronze", "marble"]
+        )
+        finish = Attribute.objects.create(
+            name="Finish", slug="finish", choices=["matte", "gloss"]
+        )
+        product_type = ProductType.objects.create(name="Sculpture")
+        product_type.allowed_attributes.add(material, finish)
+
+        for title, variants in {
+            "bronze-gloss": [("A", "20.00", {"material": "bronze", "finish": "gloss"})],
+            "bronze-matte": [("B", "21.00", {"material": "bronze", "finish": "matte"})],
+            "marble-gloss": [("C", "30.00", {"material": "marble", "finish": "gloss"})],
+            "marble-matte": [("D", "31.00", {"material": "marble", "finish": "matte"})],
+        }.items():
+            create_product(product_type, title, variants)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_facets(self, query):
+        response = self.client.get(f"/api/products/{query}")
+        self.assertEqual(response.status_code, 200)
+        return {
+            facet["slug"]: {value["value"]: value["count"] for value in facet["values"]}
+            for facet in response.json()["facets"]
+        }
+
+    def test_counts_without_filters(self):
+        self.assertEqual(
+            self.get_facets(""),
+            {
+                "finish": {"matte": 2, "gloss": 2},
+                "material": {"bronze": 2, "marble": 2},
+            },
+        )
+
+    def test_selection_does_not_zero_its_own_attribute(self):
+        facets = self.get_facets("?attr_material=bronze")
+        self.assertEqual(facets["material"], {"bronze": 2, "marble": 2})
+        self.assertEqual(facets["finish"], {"matte": 1, "gloss": 1})
+
+    def test_each_attribute_is_counted_with_the_other_selections(self):
+        facets = self.get_facets("?attr_material=bronze&attr_finish=gloss")
+        self.assertEqual(facets["material"], {"bronze": 1, "marble": 1})
+        self.assertEqual(facets["finish"], {"matte": 1, "gloss": 1})
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_attribute_changes_reach_the_cached_list(self):
+        response = self.client.get("/api/products/")
+        etag = response["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            finish = Attribute.objects.get(slug="finish")
+            finish.name = "Surface"
+            finish.save()
+
+        response = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Surface", [facet["name"] for facet in response.json()["facets"]])
+
+    def test_price_filters_apply_to_every_attribute(self):
+        facets = self.get_facets("?attr_material=bronze&max_price=25")
+        self.assertEqual(facets["material"], {"bronze": 2, "marble": 0})
+        self.assertEqual(facets["finish"], {"matte": 1, "gloss": 1})
+
+
+class CategoryTreeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Two roots, each a chain six levels deep with a sibling at every level.
+        for root_title in ("Art", "Decor"):
+            parent = None
+            for depth in range(6):
+                for suffix in ("a", "b"):
+                    node = Category.objects.create(
+                        title=f"{root_title} {depth}{suffix}", parent=parent
+                    )
+                parent = node
+
+    def setUp(self):
+        cache.clear()
+
+    def get_depth(self, nodes):
+        return max((1 + self.get_depth(node["children"]) for node in nodes), default=0)
+
+    def test_tree_is_built_from_one_query(self):
+        request = RequestFactory().get("/")
+        with self.assertNumQueries(1):
+            tree = build_category_tree(request)
+        self.assertEqual(self.get_depth(tree), 6)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_endpoint_queries_once_then_serves_from_cache(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/products/categories/")
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            self.client.get("/api/products/categories/")
+
+
+class CollectionCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product_type = ProductType.objects.create(name="Sculpture")
+        cls.products = [create_product(cls.product_type, f"Bust {i}") for i in range(3)]
+        cls.summer = Collection.objects.create(title="Summer")
+        cls.winter = Collection.objects.create(title="Winter")
+
+    def setUp(self):
+        cache.clear()
+
+    def get_counts(self):
+        return dict(
+            Collection.objects.order_by("title").values_list(
+                "title", "published_product_count"
+            )
+        )
+
+    def test_collection_side_add_remove_and_clear(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.summer.products.add(*self.products)
+        self.assertEqual(self.get_counts(), {"Summer": 3, "Winter": 0})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.summer.products.remove(self.products[0])
+        self.assertEqual(self.get_counts(), {"Summer": 2, "Winter": 0})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.summer.products.clear()
+        self.assertEqual(self.get_counts(), {"Summer": 0, "Winter": 0})
+
+    def test_product_side_add_remove_and_clear(self):
+        product = self.products[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            product.collections.add(self.summer, self.winter)
+        self.assertEqual(self.get_counts(), {"Summer": 1, "Winter": 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.collections.remove(self.winter)
+        self.assertEqual(self.get_counts(), {"Summer": 1, "Winter": 0})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.collections.add(self.winter)
+            product.collections.clear()
+        self.assertEqual(self.get_counts(), {"Summer": 0, "Winter": 0})
+
+    def test_status_flips_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.summer.products.add(*self.products)
+
+        product = Product.objects.get(pk=self.products[0].pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.status = Product.Status.DRAFT
+            product.save()
+        self.assertEqual(self.get_counts()["Summer"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.status = Product.Status.PUBLISHED
+            product.save()
+        self.assertEqual(self.get_counts()["Summer"], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.get(pk=self.products[1].pk).delete()
+        self.assertEqual(self.get_counts()["Summer"], 2)
+
+    def test_list_query_count_is_fixed_in_both_modes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.summer.products.add(*self.products)
+            self.winter.products.add(self.products[0])
+            for i in range(10):
+                Collection.objects.create(title=f"Extra {i}").products.add(
+                    *self.products
+                )
+
+        for counter_enabled in (True, False):
+            with self.subTest(counter_enabled=counter_enabled), override_settings(
+                COLLECTION_PRODUCT_COUNTER_ENABLED=counter_enabled
+            ):
+                cache.clear()
+                # The page count and the page itself.
+                with self.assertNumQueries(2):
+                    response = self.client.get("/api/products/collections/")
+                counts = {
+                    collection["title"]: collection["product_count"]
+                    for collection in response.json()["results"]
+                }
+                self.assertEqual(counts["Summer"], 3)
+                self.assertEqual(counts["Winter"], 1)
+                self.assertEqual(counts["Extra 0"], 3)
+
+
+class VariantValidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        material = Attribute.objects.create(
+            name="Material", slug="material", choices=["bronze", "marble"]
+        )
+        finish = Attribute.objects.create(name="Finish", slug="finish")
+        cls.product_type = ProductType.objects.create(name="Sculpture")
+        cls.product_type.allowed_attributes.add(material, finish)
+        cls.product = create_product(
+            cls.product_type,
+            "Bust",
+            [("A", "20.00", {"material": "bronze", "finish": "matte"})],
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def create_variant(self, sku="B", attributes=None):
+        return ProductVariant.objects.create(
+            product=self.product,
+            sku=sku,
+            price="10.00",
+            image="variants/b.jpg",
+            attributes=attributes or {"material": "marble", "finish": "matte"},
+        )
+
+    def assertInvalid(self, field, message, **kwargs):
+        with self.assertRaises(ValidationError) as ctx:
+            self.create_variant(**kwargs)
+        self.assertIn(message, " ".join(ctx.exception.message_dict[field]))
+
+    def test_attributes_follow_the_product_type(self):
+        for attributes, message in (
+            ({"material": "bronze", "finish": "matte", "size": "L"}, "not allowed"),
+            ({"material": "gold", "finish": "matte"}, "not valid for 'material'"),
+            ({"material": "bronze"}, "Missing required attributes"),
+        ):
+            with self.subTest(attributes=attributes):
+                self.assertInvalid(NON_FIELD_ERRORS, message, attributes=attributes)
+
+    def test_taken_sku_and_attributes_are_validation_errors(self):
+        self.assertInvalid("sku", "already exists", sku="A")
+        self.assertInvalid(
+            NON_FIELD_ERRORS,
+            "already exists",
+            attributes={"material": "bronze", "finish": "matte"},
+        )
+        # The failed inserts left the transaction usable.
+        self.assertEqual(self.create_variant().sku, "B")
+
+    def test_bulk_validation_costs_one_schema_lookup(self):
+        variants = [
+            ProductVariant(attributes={"material": "bronze", "finish": "matte"}),
+            ProductVariant(attributes={"material": "gold", "finish": "matte"}),
+            ProductVariant(attributes={}),
+        ]
+        with self.assertNumQueries(1):
+            errors = validate_variants_bulk(variants, self.product_type)
+        self.assertEqual([len(messages) for messages in errors], [0, 1, 1])
+
+    def test_admin_inline_reports_invalid_variants(self):
+        self.client.force_login(
+            get_user_model().objects.create_superuser("ada", password="secret")
+        )
+        other = self.create_variant()
+        variant = self.product.variants.get(sku="A")
+        data = {
+            "title": self.product.title,
+            "slug": self.product.slug,
+            "product_type": self.product_type.pk,
+            "status": self.product.status,
+            "description": "",
+            "base_price": "20.00",
+            "specifications": "{}",
+            "gallery_images-TOTAL_FORMS": "0",
+            "gallery_images-INITIAL_FORMS": "0",
+            "variants-TOTAL_FORMS": "2",
+            "variants-INITIAL_FORMS": "2",
+        }
+        for index, (row, sku, attributes) in enumerate(
+            (
+                (variant, "A", {"material": "gold", "finish": "matte"}),
+                (other, "B", {"material": "marble", "finish": "matte"}),
+            )
+        ):
+            data.update(
+                {
+                    f"variants-{index}-id": row.pk,
+                    f"variants-{index}-product": self.product.pk,
+                    f"variants-{index}-sku": sku,
+                    f"variants-{index}-stock_quantity": "5",
+                    f"variants-{index}-price": "20.00",
+                    f"variants-{index}-attributes": json.dumps(attributes),
+                }
+            )
+
+        response = self.client.post(
+            f"/admin/products/product/{self.product.pk}/change/", data
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "is not valid for &#x27;material&#x27;")
+
+        data["variants-0-attributes"] = json.dumps(
+            {"material": "bronze", "finish": "matte"}
+        )
+        data["variants-1-sku"] = "A"
+        response = self.client.post(
+            f"/admin/products/product/{self.product.pk}/change/", data
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Product variant with this Sku already exists.")
+
+
+class ImportProductsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        height = Attribute.objects.create(name="Height", slug="height")
+        cls.product_type = ProductType.objects.create(name="Sculpture")
+        cls.product_type.allowed_attributes.add(height)
+
+    def setUp(self):
+        cache.clear()
+        self.base_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_path)
+        self.enterContext(override_settings(MEDIA_ROOT=self.base_path))
+        with open(os.path.join(self.base_path, "bust.jpg"), "wb") as f:
+            f.write(b"not really a jpeg")
+
+    def write_feed(self, records):
+        with open(os.path.join(self.base_path, "products-to-import.json"), "w") as f:
+            json.dump(records, f)
+
+    def record(self, sku, height=12.5, stock_quantity=3):
+        return {
+            "clean_title": f"Bust {sku}",
+            "sku": sku,
+            "price": 19.99,
+            "stock_quantity": stock_quantity,
+            "local_image_path": "bust.jpg",
+            "attributes": {"height": height},
+            "height_cm": 30.5,
+        }
+
+    def import_products(self, **options):
+        call_command(
+            "import_products",
+            self.base_path,
+            product_type="Sculpture",
+            stdout=StringIO(),
+            **options,
+        )
+
+    def test_fractional_numbers_are_stored_in_json_fields(self):
+        self.write_feed([self.record("A")])
+        self.import_products()
+
+        variant = ProductVariant.objects.get(sku="A")
+        self.assertEqual(variant.attributes, {"height": 12.5})
+        self.assertEqual(str(variant.price), "19.99")
+        self.assertEqual(variant.product.specifications, {"height_cm": 30.5})
+
+    def test_checkpoint_of_another_feed_is_ignored(self):
+        self.write_feed([self.record("A"), self.record("B", height=20)])
+        with open(
+            os.path.join(self.base_path, ".import_products.checkpoint"), "w"
+        ) as f:
+            json.dump({"feed": {"size": 1, "mtime_ns": 1}, "processed": 1}, f)
+
+        self.import_products()
+        self.assertEqual(
+            sorted(ProductVariant.objects.values_list("sku", flat=True)), ["A", "B"]
+        )
+
+    def test_upsert_keeps_reserved_units_off_stock(self):
+        self.write_feed([self.record("A", stock_quantity=3)])
+        self.import_products()
+        variant = ProductVariant.objects.get(sku="A")
+        reserve_stock(Cart.objects.create(session_key="session"), {variant.pk: 2})
+
+        # Three on hand, two of them in a cart: nothing changed.
+        self.import_products(upsert=True)
+        variant.refresh_from_db()
+        self.assertEqual(variant.stock_quantity, 1)
+
+        self.write_feed([self.record("A", stock_quantity=5)])
+        self.import_products(upsert=True)
+        variant.refresh_from_db()
+        self.assertEqual(variant.stock_quantity, 3)
+
+
+class ProductDetailParityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog()
+
+    def setUp(self):
+        cache.clear()
+
+    def get_detail(self, product, sql_enabled):
+        with override_settings(PRODUCT_DETAIL_SQL_ENABLED=sql_enabled):
+            cache.clear()
+            response = self.client.get(f"/api/products/{product.slug}/")
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def test_sql_document_matches_the_serializer_byte_for_byte(self):
+        for product in self.products:
+            with self.subTest(product=product.title):
+                self.assertEqual(
+                    self.get_detail(product, sql_enabled=True),
+                    self.get_detail(product, sql_enabled=False),
+                )
+
+    def test_sql_document_is_one_query(self):
+        # The filterable attributes, cached from then on, and the document.
+        with override_settings(PRODUCT_DETAIL_SQL_ENABLED=True):
+            with self.assertNumQueries(2):
+                self.client.get(f"/api/products/{self.products[0].slug}/")
+
+
+class ListSerializerParityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        products = create_catalog()
+        refresh_product_listings([product.pk for product in products])
+
+    def test_product_list(self):
+        serialized, values = render_both_ways(
+            ProductViewSet.queryset.select_related("listing"),
+            ProductListSerializer,
+            ProductListValuesSerializer,
+        )
+        self.assertEqual(serialized, values)
+
+    def test_collection_list(self):
+        for counter_enabled in (True, False):
+            with self.subTest(counter_enabled=counter_enabled), override_settings(
+                COLLECTION_PRODUCT_COUNTER_ENABLED=counter_enabled
+            ):
+                serialized, values = render_both_ways(
+                    CollectionListView().get_queryset(),
+                    CollectionSerializer,
+                    CollectionValuesSerializer,
+                )
+                self.assertEqual(serialized, values)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        product_type = ProductType.objects.create(name="Sculpture")
+        for index in range(45):
+            create_product(product_type, f"Bust {index}", base_price=f"{index % 3}0.00")
+        # Groups of five share a creation time, so ids must break the ties.
+        now = timezone.now()
+        for index, pk in enumerate(Product.objects.values_list("pk", flat=True)):
+            Product.objects.filter(pk=pk).update(
+                created_at=now - timedelta(minutes=index // 5)
+            )
+        draft = create_product(product_type, "Draft")
+        Product.objects.filter(pk=draft.pk).update(status=Product.Status.DRAFT)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_ids(self, query, link="next"):
+        """The ids of every page, following 'link' from the first page."""
+        pages = []
+        url = f"/api/products/{query}"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([product["id"] for product in response.json()["results"]])
+            url = response.json()[link]
+        return pages
+
+    def get_expected_ids(self, *ordering):
+        return list(
+            Product.objects.filter(status=Product.Status.PUBLISHED)
+            .order_by(*ordering)
+            .values_list("pk", flat=True)
+        )
+
+    def test_cursors_cover_every_row_once(self):
+        for query, ordering in (
+            ("", ("-created_at", "-id")),
+            ("?ordering=base_price", ("base_price", "id")),
+            ("?ordering=-base_price", ("-base_price", "-id")),
+        ):
+            with self.subTest(query=query):
+                pages = self.get_ids(query)
+                self.assertEqual([len(page) for page in pages], [20, 20, 5])
+                self.assertEqual(
+                    [pk for page in pages for pk in page],
+                    self.get_expected_ids(*ordering),
+                )
+
+    def test_previous_links_walk_back(self):
+        forward = self.get_ids("?ordering=base_price")
+        last_page = self.client.get("/api/products/?ordering=base_price").json()
+        while last_page["next"]:
+            last_page = self.client.get(last_page["next"]).json()
+
+        backward = self.get_ids(
+            "?" + last_page["previous"].split("?", 1)[1], link="previous"
+        )
+        self.assertEqual(backward, forward[-2::-1])
+
+    def test_pages_and_searches_use_page_numbers(self):
+        for query in ("?page=2", "?search=bust"):
+            with self.subTest(query=query):
+                data = self.client.get(f"/api/products/{query}").json()
+                self.assertEqual(data["count"], 45)
+                self.assertNotIn("cursor=", data["next"] or data["previous"])
+
+
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        product_type = ProductType.objects.create(name="Sculpture")
+        for title, price, description, specifications in (
+            ("Ceramic Horse", "10.00", "", {"glaze": "bronze"}),
+            ("Marble Horse", "30.00", "A plinth of bronze", {}),
+            ("Bronze Horse", "20.00", "", {}),
+            ("Glass Vase", "40.00", "", {}),
+        ):
+            create_product(
+                product_type,
+                title,
+                base_price=price,
+                description=description,
+                specifications=specifications,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query):
+        response = self.client.get(f"/api/products/?search={query}")
+        self.assertEqual(response.status_code, 200)
+        return [product["title"] for product in response.json()["results"]]
+
+    def test_title_outranks_description_outranks_specifications(self):
+        self.assertEqual(
+            self.search("bronze"), ["Bronze Horse", "Marble Horse", "Ceramic Horse"]
+        )
+
+    def test_misspelled_titles_still_match(self):
+        self.assertEqual(self.search("bronse horse")[0], "Bronze Horse")
+        self.assertNotIn("Glass Vase", self.search("bronse horse"))
+
+    def test_explicit_ordering_replaces_the_rank(self):
+        self.assertEqual(
+            self.search("bronze&ordering=base_price"),
+            ["Ceramic Horse", "Bronze Horse", "Marble Horse"],
+        )
@@ -1,49 +1,158 @@
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import Http404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 from rest_framework.generics import ListAPIView
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
-from products.models import Category, Collection, Product
+from common.mixins import (
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    ValuesSerializerMixin,
+)
+from products.categories import get_category_tree
+from products.details import get_product_detail_document
+from products.facets import get_cached_facet_counts
+from products.filters import ProductFilter, ProductSearchFilter
+from products.models import (
+    Attribute,
+    Category,
+    Collection,
+    Product,
+    ProductGalleryImage,
+)
+from products.pagination import KeysetCursorPagination
 from products.serializers import (
     CategoryTreeSerializer,
-    CollectionSerializer,
+    CollectionValuesSerializer,
     ProductDetailSerializer,
-    ProductListSerializer,
+    ProductListValuesSerializer,
 )
 
 
-class CategoryListView(ListAPIView):
+class CategoryListView(ConditionalGetMixin, ListAPIView):
+    """Root categories with their nested children, served from the cached tree."""
+
     serializer_class = CategoryTreeSerializer
+    cache_namespaces = ["categories"]
 
     def get_queryset(self):
-        return Category.objects.filter(parent__isnull=True).prefetch_related("children")
+        return Category.objects.filter(parent__isnull=True)
+
+    def list(self, request, *args, **kwargs):
+        tree = get_category_tree(request)
 
+        page = self.paginate_queryset(tree)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(tree)
 
-class CollectionListView(ListAPIView):
-    serializer_class = CollectionSerializer
+
+class CollectionListView(
+    ConditionalGetMixin, CachedResponseMixin, ValuesSerializerMixin, ListAPIView
+):
+    serializer_class = CollectionValuesSerializer
+    cache_namespaces = ["collections"]
 
     def get_queryset(self):
-        return Collection.objects.filter(is_active=True)
+        return Collection.objects.listed()
+
 
+class ProductViewSet(
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    ValuesSerializerMixin,
+    ReadOnlyModelViewSet,
+):
+    """
+    Published catalog.
+    - Lists are keyset-paginated ('?cursor=') by default
+    - Passing '?page=' opts back into page-number pagination with a count
+    - Ranked searches ('?search=') always use page numbers, as rank is not a
+      stable keyset
+    """
 
-class ProductViewSet(ReadOnlyModelViewSet):
     queryset = Product.objects.filter(status=Product.Status.PUBLISHED).order_by(
         "-created_at"
     )
     lookup_field = "slug"
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
+        ProductSearchFilter,
         filters.OrderingFilter,
     ]
-    filterset_fields = ["categories__slug", "collections__slug"]
-    search_fields = ["title", "description", "specifications"]
+    filterset_class = ProductFilter
     ordering_fields = ["base_price", "created_at"]
 
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            query_params = self.request.query_params
+            if (
+                PageNumberPagination.page_query_param in query_params
+                or ProductSearchFilter.search_param in query_params
+            ):
+                self._paginator = PageNumberPagination()
+            else:
+                self._paginator = KeysetCursorPagination()
+        return self._paginator
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if isinstance(response.data, dict):
+            response.data["facets"] = self.get_facets()
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.PRODUCT_DETAIL_SQL_ENABLED:
+            return super().retrieve(request, *args, **kwargs)
+        return self.get_cached_response(
+            self.retrieve_document, request, *args, **kwargs
+        )
+
+    def retrieve_document(self, request, *args, **kwargs):
+        """The detail document built by Postgres, see products.details."""
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        )
+        document = get_product_detail_document(queryset, request)
+        if document is None:
+            raise Http404
+        return Response(document)
+
+    def get_facets(self):
+        # Facets are counted within the search and product-level filters;
+        # the variant filters are applied per attribute by the count itself.
+        filterset = ProductFilter(
+            self.request.query_params,
+            queryset=self.get_queryset(),
+            request=self.request,
+        )
+        filterset.is_valid()
+        products = ProductSearchFilter().filter_queryset(
+            self.request, filterset.filter_products(filterset.queryset), self
+        )
+        return get_cached_facet_counts(
+            self.request.query_params,
+            products,
+            filterset.get_attribute_values(),
+            min_price=filterset.form.cleaned_data.get("min_price"),
+            max_price=filterset.form.cleaned_data.get("max_price"),
+        )
+
+    def get_cache_namespaces(self):
+        if self.action == "retrieve":
+            return ["product-details", f"product:{self.kwargs['slug']}"]
+        # The facets name and list the choices of attributes.
+        return ["products", "attributes"]
+
     def get_serializer_class(self):
         if self.action == "retrieve":
             return ProductDetailSerializer
-        return ProductListSerializer
+        return ProductListValuesSerializer
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -51,10 +160,16 @@ class ProductViewSet(ReadOnlyModelViewSet):
         if self.action == "retrieve":
             return queryset.prefetch_related(
                 "variants",
-                "gallery_images",
+                Prefetch(
+                    "gallery_images",
+                    queryset=ProductGalleryImage.objects.order_by("pk"),
+                ),
                 "categories",
-                "product_type__allowed_attributes",
+                Prefetch(
+                    "product_type__allowed_attributes",
+                    queryset=Attribute.objects.order_by("pk"),
+                ),
                 "collections",
             )
 
-        return queryset.prefetch_related("categories")
+        return queryset
@@ -1,17 +1,18 @@
 from adminsortable2.admin import SortableAdminMixin
 from django.contrib import admin
 
+from common.admin import RenditionsAdminMixin
 from sections.models import FeaturedCategory, FeaturedProduct
 
 
 # Register your models here.
 @admin.register(FeaturedProduct)
-class FeaturedProductAdmin(SortableAdminMixin, admin.ModelAdmin):
+class FeaturedProductAdmin(RenditionsAdminMixin, SortableAdminMixin, admin.ModelAdmin):
     ordering = ["sort_order"]
     autocomplete_fields = ["product"]
 
 
 @admin.register(FeaturedCategory)
-class FeaturedCategoryAdmin(SortableAdminMixin, admin.ModelAdmin):
+class FeaturedCategoryAdmin(RenditionsAdminMixin, SortableAdminMixin, admin.ModelAdmin):
     ordering = ["sort_order"]
     autocomplete_fields = ["category"]
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SectionsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "sections"
+
+    def ready(self):
+        from sections import signals  # noqa: F401
@@ -2,7 +2,7 @@ import uuid
 
 from django.db import models
 
-from common.models import OrderableModel, TimestampedModel
+from common.models import LoadedValuesMixin, OrderableModel, TimestampedModel
 
 
 def hero_section_upload_to(instance, filename):
@@ -21,14 +21,14 @@ def featured_category_upload_to(instance, filename):
 
 
 # Create your models here.
-class FeaturedProduct(TimestampedModel, OrderableModel):
+class FeaturedProduct(LoadedValuesMixin, TimestampedModel, OrderableModel):
     product = models.ForeignKey("products.Product", on_delete=models.CASCADE)
     image = models.ImageField(
         upload_to=featured_product_upload_to, null=True, blank=True
     )
 
 
-class FeaturedCategory(TimestampedModel, OrderableModel):
+class FeaturedCategory(LoadedValuesMixin, TimestampedModel, OrderableModel):
     category = models.ForeignKey("products.Category", on_delete=models.CASCADE)
     image = models.ImageField(
         upload_to=featured_category_upload_to, null=True, blank=True
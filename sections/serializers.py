@@ -1,20 +1,45 @@
 from rest_framework import serializers
 
-from products.serializers import CategorySerializer, ProductListSerializer
+from common.renditions import ImageRenditionsField
+from common.serializers import Image, ImageRenditions, Nested, ValuesSerializer
+from products.serializers import (
+    CategorySerializer,
+    CategoryValuesSerializer,
+    ProductListSerializer,
+    ProductListValuesSerializer,
+)
 from sections.models import FeaturedCategory, FeaturedProduct
 
 
 class FeaturedProductSerializer(serializers.ModelSerializer):
     product = ProductListSerializer()
+    image_renditions = ImageRenditionsField(source="image")
 
     class Meta:
         model = FeaturedProduct
-        fields = ["product", "image"]
+        fields = ["product", "image", "image_renditions"]
 
 
 class FeaturedCategorySerializer(serializers.ModelSerializer):
     category = CategorySerializer()
+    image_renditions = ImageRenditionsField(source="image")
 
     class Meta:
         model = FeaturedCategory
-        fields = ["category", "image"]
+        fields = ["category", "image", "image_renditions"]
+
+
+class FeaturedProductValuesSerializer(ValuesSerializer):
+    fields = {
+        "product": Nested(ProductListValuesSerializer, "product"),
+        "image": Image("image", FeaturedProduct),
+        "image_renditions": ImageRenditions("image", FeaturedProduct),
+    }
+
+
+class FeaturedCategoryValuesSerializer(ValuesSerializer):
+    fields = {
+        "category": Nested(CategoryValuesSerializer, "category"),
+        "image": Image("image", FeaturedCategory),
+        "image_renditions": ImageRenditions("image", FeaturedCategory),
+    }
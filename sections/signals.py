@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from common.cache import invalidate_on_commit
+from common.renditions import generate_changed_renditions_on_commit
+from sections.models import FeaturedCategory, FeaturedProduct
+
+
+@receiver(post_save, sender=FeaturedProduct)
+@receiver(post_delete, sender=FeaturedProduct)
+def invalidate_featured_products(sender, **kwargs):
+    invalidate_on_commit("featured-products")
+
+
+@receiver(post_save, sender=FeaturedCategory)
+@receiver(post_delete, sender=FeaturedCategory)
+def invalidate_featured_categories(sender, **kwargs):
+    invalidate_on_commit("featured-categories")
+
+
+@receiver(post_save, sender=FeaturedProduct)
+@receiver(post_save, sender=FeaturedCategory)
+def generate_image_renditions(sender, instance, **kwargs):
+    generate_changed_renditions_on_commit(instance)
@@ -0,0 +1,125 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from products.listings import refresh_product_listings
+from products.models import Category, Collection
+from products.tests import create_catalog, render_both_ways
+from sections.models import FeaturedCategory, FeaturedProduct
+from sections.serializers import (
+    FeaturedCategorySerializer,
+    FeaturedCategoryValuesSerializer,
+    FeaturedProductSerializer,
+    FeaturedProductValuesSerializer,
+)
+from sections.views import get_featured_categories, get_featured_products
+
+
+class FeaturedSerializerParityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        products = create_catalog()
+        refresh_product_listings([product.pk for product in products])
+        for sort_order, product in enumerate(products):
+            FeaturedProduct.objects.create(
+                product=product,
+                sort_order=sort_order,
+                image="featured-products/hero.jpg" if sort_order else None,
+            )
+        for sort_order, category in enumerate(Category.objects.all()):
+            FeaturedCategory.objects.create(
+                category=category,
+                sort_order=sort_order,
+                image=None if sort_order else "featured-products/art.jpg",
+            )
+
+    def test_featured_products(self):
+        serialized, values = render_both_ways(
+            get_featured_products().select_related("product__listing"),
+            FeaturedProductSerializer,
+            FeaturedProductValuesSerializer,
+        )
+        self.assertEqual(serialized, values)
+
+    def test_featured_categories(self):
+        serialized, values = render_both_ways(
+            get_featured_categories().select_related("category"),
+            FeaturedCategorySerializer,
+            FeaturedCategoryValuesSerializer,
+        )
+        self.assertEqual(serialized, values)
+
+
+class HomeViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog()
+        refresh_product_listings([product.pk for product in cls.products])
+
+    def setUp(self):
+        cache.clear()
+
+    def feature(self, count):
+        for sort_order in range(count):
+            FeaturedProduct.objects.create(
+                product=self.products[sort_order % len(self.products)],
+                sort_order=sort_order,
+            )
+            FeaturedCategory.objects.create(
+                category=Category.objects.first(), sort_order=sort_order
+            )
+            Collection.objects.create(title=f"Collection {sort_order}")
+
+    def get_home(self, queries, count):
+        self.feature(count)
+        # Featured products, featured categories, collections, category tree.
+        with self.assertNumQueries(queries):
+            response = self.client.get("/api/sections/home/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["featured_products"]), count)
+        return response
+
+    def test_single_section_rows_query_count(self):
+        self.get_home(4, 1)
+
+    def test_many_section_rows_query_count(self):
+        self.get_home(4, 10)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_cached_until_featured_or_catalog_changes(self):
+        etag = self.get_home(4, 1)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/sections/home/")
+        self.assertEqual(
+            response.json()["featured_products"][0]["product"]["title"], "Héloïse"
+        )
+
+        def rename_product():
+            self.products[0].title = "Abélard"
+            self.products[0].save()
+
+        changes = {
+            "featured": lambda: FeaturedProduct.objects.create(
+                product=self.products[1], sort_order=1
+            ),
+            "catalog": rename_product,
+        }
+        for change, apply in changes.items():
+            with self.subTest(change=change):
+                with self.captureOnCommitCallbacks(execute=True):
+                    apply()
+                response = self.client.get(
+                    "/api/sections/home/", headers={"If-None-Match": etag}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etag)
+                etag = response["ETag"]
+                self.assertEqual(
+                    self.client.get(
+                        "/api/sections/home/", headers={"If-None-Match": etag}
+                    ).status_code,
+                    304,
+                )
+        featured = response.json()["featured_products"]
+        self.assertEqual(
+            [item["product"]["title"] for item in featured], ["Abélard", 'Bust "Two"']
+        )
@@ -1,8 +1,9 @@
 from django.urls import path
 
-from .views import FeaturedCategoryListView, FeaturedProductsListView
+from .views import FeaturedCategoryListView, FeaturedProductsListView, HomeView
 
 urlpatterns = [
+    path("home/", HomeView.as_view(), name="home"),
     path(
         "featured-products/",
         FeaturedProductsListView.as_view(),
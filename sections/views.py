@@ -1,20 +1,93 @@
 from rest_framework.generics import ListAPIView
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from common.mixins import (
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    ValuesSerializerMixin,
+)
+from products.categories import get_category_tree
+from products.models import Collection
+from products.serializers import CollectionValuesSerializer
 from sections.models import FeaturedCategory, FeaturedProduct
-from sections.serializers import FeaturedCategorySerializer, FeaturedProductSerializer
+from sections.serializers import (
+    FeaturedCategoryValuesSerializer,
+    FeaturedProductValuesSerializer,
+)
 
+# The homepage shows three featured categories.
+FEATURED_CATEGORY_LIMIT = 3
 
-class FeaturedProductsListView(ListAPIView):
-    serializer_class = FeaturedProductSerializer
+
+def get_featured_products():
+    return FeaturedProduct.objects.order_by("sort_order")
+
+
+def get_featured_categories():
+    return FeaturedCategory.objects.order_by("sort_order")[:FEATURED_CATEGORY_LIMIT]
+
+
+class FeaturedProductsListView(
+    ConditionalGetMixin, CachedResponseMixin, ValuesSerializerMixin, ListAPIView
+):
+    serializer_class = FeaturedProductValuesSerializer
     pagination_class = None
+    cache_namespaces = ["featured-products"]
 
     def get_queryset(self):
-        return FeaturedProduct.objects.all().order_by("sort_order")
+        return get_featured_products()
 
 
-class FeaturedCategoryListView(ListAPIView):
-    serializer_class = FeaturedCategorySerializer
+class FeaturedCategoryListView(
+    ConditionalGetMixin, CachedResponseMixin, ValuesSerializerMixin, ListAPIView
+):
+    serializer_class = FeaturedCategoryValuesSerializer
     pagination_class = None
+    cache_namespaces = ["featured-categories"]
 
     def get_queryset(self):
-        return FeaturedCategory.objects.all().order_by("sort_order")[:3]
+        return get_featured_categories()
+
+
+class HomeView(ConditionalGetMixin, CachedResponseMixin, APIView):
+    """
+    Everything the homepage renders in one response: featured products and
+    categories, the category tree and active collections.
+    - One query per section (none for a cached tree), however many rows
+    - The payload is cached until any of the sections changes
+    """
+
+    cache_namespaces = [
+        "featured-products",
+        "featured-categories",
+        "categories",
+        "collections",
+    ]
+
+    def get(self, request, *args, **kwargs):
+        return self.get_cached_response(self.get_home_response, request)
+
+    def get_home_response(self, request):
+        context = {"request": request}
+        sections = [
+            (
+                "featured_products",
+                FeaturedProductValuesSerializer,
+                get_featured_products(),
+            ),
+            (
+                "featured_categories",
+                FeaturedCategoryValuesSerializer,
+                get_featured_categories(),
+            ),
+            ("collections", CollectionValuesSerializer, Collection.objects.listed()),
+        ]
+        data = {
+            name: serializer_class(
+                serializer_class.get_queryset(queryset), many=True, context=context
+            ).data
+            for name, serializer_class, queryset in sections
+        }
+        data["categories"] = get_category_tree(request)
+        return Response(data)